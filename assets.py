@@ -0,0 +1,48 @@
+import hashlib
+import os
+import time
+
+import pygame
+
+
+CACHE_DIR = "files/cache"
+
+sounds = {}  # path -> pygame.mixer.Sound shared by every game
+metrics = {"decoded": 0, "from_cache": 0, "shared": 0, "load_seconds": 0.0}
+
+
+def load_sound(path, volume=0.5):
+    """Sound for `path`, decoded once per process and kept on disk as raw PCM for later launches."""
+    sound = sounds.get(path)
+    if sound is not None:
+        metrics["shared"] += 1
+        return sound
+
+    start = time.perf_counter()
+    with open(path, "rb") as file:
+        key = hashlib.sha1(file.read()).hexdigest()
+    # Raw samples only make sense for the mixer format they were decoded for
+    frequency, size, channels = pygame.mixer.get_init()
+    cache_path = os.path.join(CACHE_DIR, f"{key}-{frequency}-{size}-{channels}.pcm")
+
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as file:
+            sound = pygame.mixer.Sound(buffer=file.read())
+        metrics["from_cache"] += 1
+    else:
+        sound = pygame.mixer.Sound(path)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path + ".tmp", "wb") as file:
+            file.write(sound.get_raw())
+        os.replace(cache_path + ".tmp", cache_path)
+        metrics["decoded"] += 1
+
+    sound.set_volume(volume)
+    sounds[path] = sound
+    metrics["load_seconds"] += time.perf_counter() - start
+    return sound
+
+
+def report():
+    return (f"sounds: {metrics['decoded']} decoded, {metrics['from_cache']} from PCM cache, "
+            f"{metrics['shared']} shared, {metrics['load_seconds'] * 1e3:.1f} ms loading")
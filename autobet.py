@@ -0,0 +1,127 @@
+import numpy as np
+
+import dice_engine
+import mines_engine
+
+
+class FlatBet:
+    """Always bet the same amount."""
+
+    def __init__(self, amount):
+        self.amount = amount
+
+    def next_bet(self, balance, last_net):
+        return self.amount
+
+
+class Martingale:
+    """Multiply the bet by `factor` after each loss and go back to the base bet after a win."""
+
+    def __init__(self, base, factor=2.0):
+        self.base = base
+        self.factor = factor
+        self.amount = base
+
+    def next_bet(self, balance, last_net):
+        if last_net is None or last_net > 0:
+            self.amount = self.base
+        else:
+            self.amount *= self.factor
+        return self.amount
+
+
+class StopLimits:
+    """Stop another strategy once the balance falls to `stop_loss` or reaches `take_profit`."""
+
+    def __init__(self, strategy, stop_loss=None, take_profit=None):
+        self.strategy = strategy
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+
+    def next_bet(self, balance, last_net):
+        if self.stop_loss is not None and balance <= self.stop_loss:
+            return None
+        if self.take_profit is not None and balance >= self.take_profit:
+            return None
+        return self.strategy.next_bet(balance, last_net)
+
+
+def default_strategy(bet, balance):
+    """Flat betting that stops after losing half the balance or doubling it."""
+    return StopLimits(FlatBet(bet), stop_loss=balance / 2, take_profit=balance * 2)
+
+
+class AutoBet:
+    """Asks a strategy for each bet and keeps the counters shown while it runs."""
+
+    def __init__(self, strategy, max_bets=None):
+        self.strategy = strategy
+        self.max_bets = max_bets
+        self.bets = 0
+        self.wins = 0
+        self.profit = 0.0
+        self.last_net = None
+        self.running = True
+
+    def next_bet(self, balance):
+        """Amount of the next bet, or None once the run is over."""
+        if not self.running:
+            return None
+        amount = self.strategy.next_bet(balance, self.last_net)
+        if amount is None or amount <= 0 or amount > balance or self.bets == self.max_bets:
+            self.running = False
+            return None
+        return amount
+
+    def record(self, net):
+        self.bets += 1
+        self.wins += net > 0
+        self.profit += net
+        self.last_net = net
+
+    def status(self):
+        return f"Auto: {self.bets} bets ({self.wins} won)"
+
+
+class HeadlessDice:
+    """Dice auto-bet without a window; exposes `balance` like the games do."""
+
+    def __init__(self, balance, strategy, bets, cursor_pos=dice_engine.LINE_START + dice_engine.LINE_WIDTH // 2, rng=None):
+        self.balance = balance
+        self.auto = AutoBet(strategy, bets)
+        self.cursor_pos = cursor_pos
+        self.rng = rng or np.random.default_rng()
+
+    def run(self, chunk=10_000):
+        multiplier = float(dice_engine.MULTIPLIERS[self.cursor_pos - dice_engine.LINE_START])
+        while True:
+            for arrow_pos in dice_engine.draw_arrows(self.rng, chunk).tolist():
+                amount = self.auto.next_bet(self.balance)
+                if amount is None:
+                    return self.auto
+                net = amount * multiplier if arrow_pos > self.cursor_pos else -amount
+                self.balance += net
+                self.auto.record(net)
+
+
+class HeadlessMines:
+    """Mines auto-bet without a window: each round reveals `reveals` cells then cashes out."""
+
+    def __init__(self, balance, strategy, rounds, mine_count=mines_engine.DEFAULT_MINE_COUNT, reveals=3, rng=None):
+        self.balance = balance
+        self.auto = AutoBet(strategy, rounds)
+        self.mine_count = mine_count
+        self.reveals = reveals
+        self.rng = rng or np.random.default_rng()
+
+    def run(self, chunk=10_000):
+        cells = mines_engine.ROWS * mines_engine.COLS
+        while True:
+            hits = self.rng.hypergeometric(self.mine_count, cells - self.mine_count, self.reveals, chunk)
+            for mines_hit in hits.tolist():
+                amount = self.auto.next_bet(self.balance)
+                if amount is None:
+                    return self.auto
+                net = mines_engine.reward(amount, self.mine_count, self.reveals, cells) - amount if mines_hit == 0 else -amount
+                self.balance += net
+                self.auto.record(net)
@@ -0,0 +1,120 @@
+"""Bulk transfers read from a CSV or JSONL file.
+
+Each row gives the sender and the receiver by user_id and the amount, plus
+an optional description:
+
+    CSV (with a header line):  from,to,amount[,description]
+    JSONL:                     {"from": ..., "to": ..., "amount": ...}
+"""
+import csv
+import functools
+import json
+
+
+# Sender/receiver pairs whose users, locks and descriptions an import keeps at hand
+PAIR_CACHE_SIZE = 1024
+
+
+class BatchReport:
+    """Outcome of an import: rows applied, money moved and (line, message) of every rejected row."""
+
+    def __init__(self):
+        self.applied = 0
+        self.total = 0.0
+        self.errors = []
+
+
+def read_rows(path):
+    """Yield (line number, sender id, receiver id, amount, description) for each row of the file.
+
+    Fields are returned as read, without checks. A row missing a field, or a
+    line that cannot be parsed, comes back with None in every field.
+    """
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    yield line_number, row["from"], row["to"], row["amount"], row.get("description")
+                except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                    yield line_number, None, None, None, None
+    else:
+        with open(path, newline="", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            try:
+                columns = [header.index(field) for field in ("from", "to", "amount")]
+            except ValueError:  # No usable header: report it once rather than every row
+                yield 1, None, None, None, None
+                return
+            description = header.index("description") if "description" in header else len(header)
+            width = max(columns) + 1
+            sender, receiver, amount = columns
+            for row in reader:
+                if len(row) < width:
+                    yield reader.line_num, None, None, None, None
+                else:
+                    yield (reader.line_num, row[sender], row[receiver], row[amount],
+                           row[description] if description < len(row) else None)
+
+
+def import_transfers(bank, path, chunk_size=None):
+    """Apply every valid transfer of the file in a single pass and return a BatchReport.
+
+    Rows are checked against the balances as they stand after the rows
+    before them. The changed users are saved every `chunk_size` applied
+    transfers, or once at the end when it is None.
+    """
+    report = BatchReport()
+    changed = {}
+
+    @functools.lru_cache(maxsize=PAIR_CACHE_SIZE)
+    def pair(sender_id, receiver_id):
+        """The sender, the receiver, their locks and default descriptions, or None if either is unknown."""
+        sender = bank.get_user(sender_id)
+        receiver = bank.get_user(receiver_id)
+        if sender is None or receiver is None:
+            return None
+        return (sender, receiver, bank.lock_order(sender, receiver),
+                f"Transfert à {receiver.name} {receiver.surname}", f"Transfert de {sender.name} {sender.surname}")
+
+    for line, sender_id, receiver_id, amount, description in read_rows(path):
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            report.errors.append((line, "Ligne invalide."))
+            continue
+        users = pair(sender_id, receiver_id)
+        if users is None:
+            report.errors.append((line, "Utilisateur inconnu."))
+            continue
+        sender, receiver, locks, sent, received = users
+        if not amount > 0:
+            report.errors.append((line, "Montant invalide."))
+            continue
+
+        for lock in locks:
+            lock.acquire()
+        try:
+            if sender.balance < amount:
+                report.errors.append((line, "Fonds insuffisants."))
+                continue
+            sender.balance -= amount
+            receiver.balance += amount
+            bank.ledger.append_many(((sender.user_id, description or sent, -amount),
+                                     (receiver.user_id, description or received, amount)))
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        changed[sender.user_id] = sender
+        changed[receiver.user_id] = receiver
+        report.applied += 1
+        report.total += amount
+
+        if chunk_size and report.applied % chunk_size == 0:
+            bank.save_users(*changed.values())
+            changed.clear()
+    bank.save_users(*changed.values())
+    return report
@@ -0,0 +1,427 @@
+"""Benchmarks for X Bank.
+
+Usage: python bench.py [name ...]   (runs every benchmark when no name is given)
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+
+def bench_login(sizes=(1_000, 10_000, 100_000, 1_000_000), lookups=10_000):
+    """Login time must stay flat as the number of users grows."""
+    from main import Bank, User
+    from storage import JournalStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = Bank(store=JournalStore(os.path.join(tmp, "credentials.json"), os.path.join(tmp, "journal.jsonl")))
+        password = hashlib.md5(b"123456").hexdigest()
+        count = 0
+        for size in sizes:
+            while count < size:
+                bank.index_user(User(f"name{count}", f"surname{count}", password, 30, f"id{count}"))
+                count += 1
+            targets = [(f"name{i}", f"surname{i}") for i in range(0, size, max(1, size // lookups))]
+            start = time.perf_counter()
+            for name, surname in targets:
+                assert bank.authenticate(name, surname, "123456") is not None
+            elapsed = time.perf_counter() - start
+            print(f"login  users={size:>9}  {elapsed / len(targets) * 1e6:8.2f} us/login")
+
+
+def bench_scheduler(loans=100_000, months=3, speed=1_000_000):
+    """Thread count and memory must stay flat with 100k loans on the scheduler."""
+    import threading
+    import tracemalloc
+    from scheduler import LoanScheduler, SimulatedClock
+
+    payments = 0
+    done = threading.Event()
+
+    def repay(user_ids):
+        nonlocal payments
+        payments += len(user_ids)
+        if payments >= loans * months:
+            done.set()
+        return set(user_ids)
+
+    threads_before = threading.active_count()
+    tracemalloc.start()
+    scheduler = LoanScheduler(repay, clock=SimulatedClock(speed))
+    start = time.perf_counter()
+    for i in range(loans):
+        scheduler.schedule(f"id{i}")
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    done.wait()
+    elapsed = time.perf_counter() - start
+    print(f"scheduler  loans={loans}  threads +{threading.active_count() - threads_before}  "
+          f"{memory / loans:.0f} B/loan  {payments / elapsed:,.0f} repayments/s")
+
+
+def bench_settlement(loans=1_000_000):
+    """Month-end repayment of 1M loans through Bank.repay_loans, saving included, next to the bare kernel."""
+    import numpy as np
+    from main import Bank, User
+    from settlement import settle
+    from storage import JournalStore
+
+    rng = np.random.default_rng(0)
+    balances = rng.uniform(0, 2000, loans)
+    principal = rng.uniform(0, 1000, loans)
+    installments = np.round(rng.uniform(10, 100, loans), 2)
+    start = time.perf_counter()
+    settle(balances, principal, installments)
+    print(f"settlement  loans={loans:,}  kernel {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = Bank(store=JournalStore(os.path.join(tmp, "credentials.json"), os.path.join(tmp, "journal.jsonl")))
+        for index, (balance, remaining, installment) in enumerate(zip(balances.tolist(), principal.tolist(),
+                                                                      installments.tolist())):
+            user = User(f"name{index}", f"surname{index}", "", 30, f"id{index}", balance=balance, ledger=bank.ledger)
+            user.loans = {"Prêt": remaining, "mensualite": installment}
+            bank.index_user(user)
+        # Every borrower has the row of the loan it was granted
+        bank.ledger.append_many((user.user_id, "Prêt reçu", user.loans["Prêt"]) for user in bank.users.values())
+        bank.store.snapshot(list(bank.users.values()))
+        total = sum(user.balance for user in bank.users.values())
+        granted = sum(bank.ledger.total(user.user_id) for user in bank.users.values())
+
+        start = time.perf_counter()
+        active = bank.repay_loans(list(bank.users))
+        elapsed = time.perf_counter() - start
+        after = sum(user.balance for user in bank.users.values())
+        logged = sum(bank.ledger.total(user.user_id) for user in bank.users.values()) - granted
+        assert abs(total + logged - after) < 1e-3, (total, logged, after)
+        print(f"settlement  loans={loans:,}  repay_loans {elapsed:.2f} s  {loans / elapsed:,.0f} loans/s  "
+              f"{len(active):,} repaid (saving included)")
+
+
+def bench_chart(years=(1, 5, 10), width=120):
+    """Chart rendering time should not depend on the length of the series."""
+    import contextlib
+    import io
+    from datetime import date
+    from charts import plot_price_series
+    from market import price_series
+
+    for count in years:
+        series = price_series("BENCH", date.today(), 365 * count)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            plot_price_series(series, "bench", width=width)
+        print(f"chart  days={len(series):>5}  {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+
+def bench_mines_rtp(rounds=1_000_000, reveals=3):
+    """Return-to-player of the Mines payout for every mine count, from simulated rounds."""
+    from mines_engine import MAX_MINES, simulate_rounds
+
+    start = time.perf_counter()
+    for mine_count in range(1, MAX_MINES + 1):
+        stats = simulate_rounds(mine_count, min(reveals, MAX_MINES + 1 - mine_count), rounds)
+        print(f"mines  mines={mine_count:>2}  win rate {stats['win_rate']:6.1%}  RTP {stats['rtp']:6.1%}")
+    print(f"mines  {MAX_MINES * rounds:,} rounds in {time.perf_counter() - start:.2f} s")
+
+
+def bench_dice(bets=10_000_000):
+    """Replay and price 10M dice bets."""
+    import numpy as np
+    import dice_engine
+
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    cursors = rng.integers(dice_engine.LINE_START, dice_engine.LINE_END + 1, bets)
+    amounts = np.full(bets, 0.001)
+    net, balances, accepted = dice_engine.settle(cursors, amounts, dice_engine.draw_arrows(rng, bets), 1e6)
+    elapsed = time.perf_counter() - start
+    print(f"dice  bets={bets:,}  {elapsed:.2f} s  house result {-net.sum():+.2f}  "
+          f"expected {-(amounts * dice_engine.EXPECTED_RETURN[cursors - dice_engine.LINE_START]).sum():+.2f}")
+
+
+def bench_text(frames=500):
+    """Steady-state frame time of the game screens, idle and while dragging the dice cursor, with and without the text caches."""
+    import pygame
+    import ui
+    import dice
+    import mines
+
+    def render_uncached(font, text, color):
+        return font.render(text, True, color)
+
+    def drag(game, frame):
+        game.cursor_pos = dice.LINE_PADDING + frame * 7 % dice.LINE_WIDTH
+
+    cached = ui.render_label, ui.render_text
+    screen = pygame.display.set_mode((dice.WIDTH, dice.HEIGHT))
+    scenarios = (("dice", dice.run_dice(1.0), None), ("dice", dice.run_dice(1.0), drag),
+                 ("mines", mines.run_mines(1.0), None))
+    for name, game, move in scenarios:
+        for use_cache in (False, True):
+            ui.labels.clear()
+            cached[1].cache_clear()
+            if not use_cache:
+                ui.render_label = ui.render_text = render_uncached
+            try:
+                game.draw(screen)  # The first frame draws everything and fills the caches
+                labels, misses = len(ui.labels), cached[1].cache_info().misses
+                start = time.perf_counter()
+                for frame in range(frames):
+                    if move:
+                        move(game, frame)
+                    game.draw(screen)
+                elapsed = time.perf_counter() - start
+            finally:
+                ui.render_label, ui.render_text = cached
+            renders = (len(ui.labels) - labels + cached[1].cache_info().misses - misses) / frames if use_cache else None
+            print(f"text  {name:<5}  {'drag' if move else 'idle':<4}  {'cached' if use_cache else 'uncached':<8}  "
+                  f"{elapsed / frames * 1e3:.3f} ms/frame" + (f"  {renders:.2f} renders/frame" if use_cache else ""))
+
+
+def bench_assets():
+    """Sound loading: MP3 decode on a cold PCM cache, then the PCM cache, then in-process sharing."""
+    import glob
+    import pygame
+    import assets
+
+    pygame.mixer.init()
+    paths = sorted(glob.glob("audios/*.mp3"))
+    with tempfile.TemporaryDirectory() as tmp:
+        assets.CACHE_DIR = tmp
+        for label in ("cold", "pcm cache", "shared"):
+            if label != "shared":
+                assets.sounds.clear()
+            start = time.perf_counter()
+            for path in paths:
+                assets.load_sound(path)
+            print(f"assets  {label:<9}  {(time.perf_counter() - start) * 1e3:7.1f} ms for {len(paths)} sounds")
+    print(f"assets  {assets.report()}")
+
+
+def bench_loop(seconds=3):
+    """CPU use of each game loop while idle and while auto-betting."""
+    import contextlib
+    import io
+    import pygame
+    import dice
+    import mines
+
+    for name, make_game in (("dice", dice.run_dice), ("mines", mines.run_mines)):
+        for session in ("idle", "active"):
+            game = make_game(1000.0)
+            if session == "active":
+                game.change_bet(1.0)  # Mines starts with no bet
+                game.toggle_auto()
+            pygame.init()  # The previous run closed the display
+            pygame.time.set_timer(pygame.QUIT, seconds * 1000, loops=1)
+            cpu, wall = time.process_time(), time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                game.run()
+            usage = (time.process_time() - cpu) / (time.perf_counter() - wall)
+            bets = game.auto.bets if game.auto else 0
+            print(f"loop  {name:<5}  {session:<6}  CPU {usage:6.1%}  {bets} bets")
+
+
+STARTUP_SCRIPT = """
+import contextlib, io, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+bank = main.Bank()
+constructed = time.perf_counter()
+bank.clear_screen = lambda: None
+with contextlib.redirect_stdout(io.StringIO()):
+    bank.show_main_menu()
+rendered = time.perf_counter()
+print(imported - start, constructed - imported, rendered - constructed, int("pygame" in sys.modules))
+"""
+
+
+def bench_startup(runs=5):
+    """Cold start in a fresh interpreter: import main, construct Bank() and render the first menu."""
+    import subprocess
+
+    totals = [0.0, 0.0, 0.0]
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, check=True)
+        *timings, pygame_loaded = result.stdout.split()
+        totals = [total + float(timing) for total, timing in zip(totals, timings)]
+    imported, constructed, rendered = (total / runs * 1e3 for total in totals)
+    print(f"startup  import {imported:.1f} ms  Bank() {constructed:.1f} ms  first menu {rendered:.1f} ms  "
+          f"pygame loaded: {pygame_loaded == '1'}")
+
+
+def bench_ledger(accounts=1_000, transactions=1_000_000, queries=1_000):
+    """Bytes per transaction, and per-account queries that must not depend on the ledger size."""
+    import random
+    from ledger import Ledger
+
+    ledger = Ledger()
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for i in range(transactions):
+        ledger.append(f"id{rng.randrange(accounts)}", rng.choice(("Transfert", "Prêt reçu", "Remboursement")),
+                      rng.uniform(-100, 100), 1e9 + i)
+    print(f"ledger  {transactions:,} appends in {time.perf_counter() - start:.2f} s  "
+          f"{ledger.nbytes() / transactions:.1f} bytes/transaction")
+
+    targets = [f"id{rng.randrange(accounts)}" for _ in range(queries)]
+    for label, query in (
+        ("last 20", lambda user_id: ledger.page(20, user_id=user_id, newest_first=True)),
+        ("sum", lambda user_id: ledger.total(user_id, 1e9 + transactions / 4, 1e9 + transactions / 2)),
+        ("balance at", lambda user_id: ledger.balance_at(user_id, 1e9 + transactions / 2, 0.0)),
+    ):
+        start = time.perf_counter()
+        for user_id in targets:
+            query(user_id)
+        print(f"ledger  {label:<10}  {(time.perf_counter() - start) / queries * 1e6:8.2f} us/query")
+
+
+def bench_server(clients=50, requests=200):
+    """Load test of server.py on localhost: ops/sec and latency percentiles of concurrent sessions."""
+    import asyncio
+    import json
+    import threading
+    from main import Bank, User
+    from server import serve
+    from storage import JournalStore
+
+    async def client(port, index, latencies):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+        async def call(**request):
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            return reply
+
+        session = (await call(op="login", name=f"name{index}", surname=f"surname{index}", password="123456"))["session"]
+        for i in range(requests):
+            if i % 2:
+                await call(op="transfer", session=session, to=f"id{(index + 1) % clients}", amount=1)
+            else:
+                await call(op="balance", session=session)
+        writer.close()
+
+    async def load(port):
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(client(port, index, latencies) for index in range(clients)))
+        return time.perf_counter() - start, sorted(latencies)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = Bank(store=JournalStore(os.path.join(tmp, "credentials.json"), os.path.join(tmp, "journal.jsonl")))
+        password = hashlib.md5(b"123456").hexdigest()
+        for index in range(clients):
+            user = User(f"name{index}", f"surname{index}", password, 30, f"id{index}", balance=1000, ledger=bank.ledger)
+            bank.index_user(user)
+            bank.store.create(user)
+        total = sum(user.balance for user in bank.users.values())
+
+        ready = threading.Event()
+        ports = []
+        threading.Thread(target=asyncio.run, daemon=True,
+                         args=(serve(bank, port=0, ready=lambda port: (ports.append(port), ready.set())),)).start()
+        ready.wait()
+        elapsed, latencies = asyncio.run(load(ports[0]))
+        assert abs(sum(user.balance for user in bank.users.values()) - total) < 1e-6
+        print(f"server  clients={clients}  {len(latencies) / elapsed:,.0f} ops/s  "
+              f"p50 {latencies[len(latencies) // 2] * 1e3:.2f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms")
+
+
+def bench_transfers(accounts=1_000, transfers=100_000, threads=(1, 2, 4, 8)):
+    """Random transfers from a thread pool: throughput per thread count, and no money created or lost.
+
+    Transfers between disjoint accounts no longer wait on each other's locks,
+    but the work is pure Python under the GIL: more threads check that
+    concurrent transfers stay consistent, they do not add throughput.
+    """
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from main import Bank, BankError, User
+    from storage import JournalStore
+
+    def worker(bank, seed, count):
+        rng = random.Random(seed)
+        users = list(bank.users.values())
+        refused = 0
+        for _ in range(count):
+            sender, receiver = rng.sample(users, 2)
+            try:
+                bank.transfer(sender, receiver, rng.uniform(1, 50))
+            except BankError:
+                refused += 1
+        return refused
+
+    for count in threads:
+        with tempfile.TemporaryDirectory() as tmp:
+            bank = Bank(store=JournalStore(os.path.join(tmp, "credentials.json"), os.path.join(tmp, "journal.jsonl")))
+            for index in range(accounts):
+                bank.index_user(User(f"name{index}", f"surname{index}", "", 30, f"id{index:05}", balance=100.0,
+                                     ledger=bank.ledger))
+            total = sum(user.balance for user in bank.users.values())
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(count) as pool:
+                refused = sum(pool.map(worker, [bank] * count, range(count), [transfers // count] * count))
+            elapsed = time.perf_counter() - start
+
+            after = sum(user.balance for user in bank.users.values())
+            logged = sum(bank.ledger.total(user.user_id) for user in bank.users.values())
+            assert abs(after - total) < 1e-6 and abs(logged) < 1e-6, (total, after, logged)
+            print(f"transfers  threads={count}  {transfers / elapsed:,.0f} transfers/s  "
+                  f"{refused:,} refused  total {after:,.2f} (unchanged)")
+
+
+def bench_batch(rows=1_000_000, employees=1_000):
+    """Import a payroll file of 1M transfers from one employer to its employees."""
+    import csv
+    from batch import import_transfers
+    from main import Bank, User
+    from storage import JournalStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = Bank(store=JournalStore(os.path.join(tmp, "credentials.json"), os.path.join(tmp, "journal.jsonl")))
+        for index in range(employees + 1):
+            user = User(f"name{index}", f"surname{index}", "", 30, f"id{index}", balance=1e9 if index == 0 else 0.0,
+                        ledger=bank.ledger)
+            bank.index_user(user)
+            bank.store.create(user)
+        path = os.path.join(tmp, "payroll.csv")
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["from", "to", "amount"])
+            writer.writerows(("id0", f"id{1 + i % employees}", 100) for i in range(rows))
+
+        start = time.perf_counter()
+        report = import_transfers(bank, path)
+        elapsed = time.perf_counter() - start
+        assert report.applied == rows and not report.errors
+        assert abs(sum(user.balance for user in bank.users.values()) - 1e9) < 1e-3
+        print(f"batch  rows={rows:,}  {elapsed:.2f} s  {rows / elapsed:,.0f} rows/s (saving included)")
+
+
+BENCHMARKS = {
+    "login": bench_login,
+    "scheduler": bench_scheduler,
+    "settlement": bench_settlement,
+    "chart": bench_chart,
+    "mines_rtp": bench_mines_rtp,
+    "dice": bench_dice,
+    "text": bench_text,
+    "startup": bench_startup,
+    "assets": bench_assets,
+    "loop": bench_loop,
+    "ledger": bench_ledger,
+    "server": bench_server,
+    "transfers": bench_transfers,
+    "batch": bench_batch,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
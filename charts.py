@@ -0,0 +1,66 @@
+import shutil
+
+import numpy as np
+
+
+def lttb(y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def runs(steps):
+    """(start, end) point index pairs of the consecutive stretches of True steps, step i joining points i and i + 1."""
+    up = np.concatenate(([False], steps, [False]))
+    changes = np.flatnonzero(up[1:] != up[:-1])
+    return list(zip(changes[::2].tolist(), changes[1::2].tolist()))
+
+
+def gapped(x, y, stretches):
+    """One x and one y list holding every stretch, each followed by a NaN so the line breaks there."""
+    xs, ys = [], []
+    for start, end in stretches:
+        xs += x[start:end + 1]
+        xs.append(x[end])
+        ys += y[start:end + 1]
+        ys.append(float("nan"))
+    return xs, ys
+
+
+def plot_price_series(series, title, width=None):
+    """Plot a PriceSeries in the terminal, rising stretches in green and falling ones in red."""
+    import plotext as plt
+
+    width = width or shutil.get_terminal_size().columns
+    kept = lttb(series.close, width)
+    x = kept.tolist()
+    y = series.close[kept]
+    rising = y[1:] > y[:-1]
+    values = y.tolist()
+
+    plt.clf()  # Clear previous plot if any
+    # One series per color, its stretches separated by NaN gaps
+    plt.plot(*gapped(x, values, runs(rising)), color="green")
+    plt.plot(*gapped(x, values, runs(~rising)), color="red")
+
+    plt.title(title)
+    plt.xlabel("Date")
+    plt.ylabel("Price ($)")
+    ticks = kept[np.linspace(0, len(kept) - 1, min(len(kept), 8)).astype(np.int64)]
+    plt.xticks(ticks.tolist(), [day.strftime('%d/%m/%Y') for day in series.dates[ticks].tolist()])
+    plt.show()
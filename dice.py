@@ -1,267 +1,346 @@
-import pygame
-import random
-import sys
-
-# Initialize Pygame
-pygame.init()
-
-# Screen dimensions
-WIDTH, HEIGHT = 1100, 700
-LINE_WIDTH = 600
-LINE_HEIGHT = 20
-LINE_Y = HEIGHT // 2
-CURSOR_WIDTH = 10
-
-# Padding and dimensions
-DASHBOARD_WIDTH = 300
-DASHBOARD_PADDING = 20
-LINE_PADDING = 40  # Space between line and dashboard
-
-# Colors
-BG_COLOR = (24, 26, 27)
-LINE_COLOR = (43, 47, 50)
-GREEN_COLOR = (0, 204, 102)
-RED_COLOR = (220, 20, 60)
-CURSOR_COLOR = (128, 128, 128)
-TEXT_COLOR = (255, 255, 255)
-HIDDEN_COLOR = (24, 24, 24)
-
-# Fonts
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 28)
-
-# Sounds
-slide_sound = pygame.mixer.Sound("audios/slide.mp3")
-arrow_sound = pygame.mixer.Sound("audios/arrow.mp3")
-win_sound = pygame.mixer.Sound("audios/win.mp3")
-lose_sound = pygame.mixer.Sound("audios/lose.mp3")
-bet_sound = pygame.mixer.Sound("audios/bet.mp3")
-
-# Set volume for sounds
-slide_sound.set_volume(0.5)
-arrow_sound.set_volume(0.5)
-win_sound.set_volume(0.5)
-lose_sound.set_volume(0.5)
-
-# Conversion rates
-conversion_rates = {
-    "BTC": 1,
-    "ETH": 15,
-    "USD": 100000,
-    "EUR": 93565,
-}
-
-class Button:
-    def __init__(self, x, y, width, height, text, action=None, enabled=True):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.text = text
-        self.action = action
-        self.enabled = enabled
-        self.hovered = False
-
-    def draw(self, screen):
-        color = CURSOR_COLOR if self.hovered else GREEN_COLOR if self.enabled else RED_COLOR
-        pygame.draw.rect(screen, color, self.rect, border_radius=8)
-        text_surface = small_font.render(self.text, True, TEXT_COLOR)
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        screen.blit(text_surface, text_rect)
-
-    def is_hovered(self, pos):
-        return self.rect.collidepoint(pos)
-
-    def handle_click(self, pos):
-        if self.enabled and self.is_hovered(pos) and self.action:
-            self.action()
-
-class Dropdown:
-    def __init__(self, x, y, width, height, options, selected_index=0, action=None):
-        self.rect = pygame.Rect(x, y, width, height)
-        self.options = options
-        self.selected_index = selected_index
-        self.expanded = False
-        self.action = action
-
-    def draw(self, screen):
-        pygame.draw.rect(screen, GREEN_COLOR, self.rect, border_radius=8)
-        selected_option = self.options[self.selected_index]
-        text_surface = small_font.render(selected_option, True, TEXT_COLOR)
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        screen.blit(text_surface, text_rect)
-
-        if self.expanded:
-            for i, option in enumerate(self.options):
-                option_rect = pygame.Rect(self.rect.x, self.rect.y + (i + 1) * self.rect.height, self.rect.width, self.rect.height)
-                pygame.draw.rect(screen, GREEN_COLOR, option_rect, border_radius=8)
-                option_text = small_font.render(option, True, TEXT_COLOR)
-                option_text_rect = option_text.get_rect(center=option_rect.center)
-                screen.blit(option_text, option_text_rect)
-
-    def handle_click(self, pos):
-        if self.expanded:
-            for i, option in enumerate(self.options):
-                option_rect = pygame.Rect(self.rect.x, self.rect.y + (i + 1) * self.rect.height, self.rect.width, self.rect.height)
-                if option_rect.collidepoint(pos):
-                    self.selected_index = i
-                    self.expanded = False
-                    if self.action:
-                        self.action(self.options[self.selected_index])
-                    return
-        if self.rect.collidepoint(pos):
-            self.expanded = not self.expanded
-
-class StakeDiceGame:
-    def __init__(self, balance):
-        self.balance = balance
-        self.bet_amount = 0.00001
-        self.reward = 0
-        self.cursor_pos = LINE_PADDING + LINE_WIDTH // 2  # Center the cursor on the line
-        self.currency = "EUR"
-        self.holding_cursor = False
-
-        # UI Elements
-        button_width, button_height = 150, 40
-        button_x = WIDTH - DASHBOARD_WIDTH + DASHBOARD_PADDING
-        self.dropdown = Dropdown(940, DASHBOARD_PADDING, button_width, button_height, ["BTC", "ETH", "USD", "EUR"], action=self.change_currency)
-        self.buttons = {
-            "bet": Button(button_x, DASHBOARD_PADDING + 80, button_width, button_height, "Bet", self.bet),
-            "increase_bet": Button(button_x, DASHBOARD_PADDING + 140, button_width, button_height, "+ Bet", lambda: self.change_bet(0.0001)),
-            "decrease_bet": Button(button_x, DASHBOARD_PADDING + 200, button_width, button_height, "- Bet", lambda: self.change_bet(-0.0001)),
-        }
-
-    def draw_line(self, screen):
-        """Draw the main horizontal line with red and green sides."""
-        line_start_x = LINE_PADDING
-        line_end_x = line_start_x + LINE_WIDTH
-
-        mid_x = self.cursor_pos  # Midpoint divides red and green sections
-        pygame.draw.line(screen, RED_COLOR, (line_start_x, LINE_Y), (mid_x, LINE_Y), LINE_HEIGHT)
-        pygame.draw.line(screen, GREEN_COLOR, (mid_x, LINE_Y), (line_end_x, LINE_Y), LINE_HEIGHT)
-
-    def draw_cursor(self, screen):
-        """Draw the cursor on the line."""
-        cursor_rect = pygame.Rect(self.cursor_pos - CURSOR_WIDTH // 2, LINE_Y - LINE_HEIGHT // 2 - 20, CURSOR_WIDTH, LINE_HEIGHT + 40)
-        pygame.draw.rect(screen, CURSOR_COLOR, cursor_rect, border_radius=8)
-        percentage = (self.cursor_pos - LINE_PADDING) / LINE_WIDTH * 100
-        text_surface = font.render(f"{percentage:.1f}%", True, TEXT_COLOR)
-        text_rect = text_surface.get_rect(center=(self.cursor_pos, LINE_Y - 40))
-        screen.blit(text_surface, text_rect)
-
-    def calculate_reward(self, chance):
-        """Calculate the reward based on the chance."""
-        # Slightly less than bet amount at 50%
-        if chance == 50:
-            return self.bet_amount * 0.95
-        if chance != 0:
-            return (self.bet_amount / (chance / 95)) / 2
-        else:
-            return 0
-
-    def bet(self):
-        """Handle the betting logic."""
-        if self.bet_amount > self.balance:
-            print("Cannot bet more than your current balance!")
-            return
-
-        arrow_pos = random.randint(LINE_PADDING, LINE_PADDING + LINE_WIDTH)
-        arrow_sound.play()
-
-        pygame.draw.line(screen, CURSOR_COLOR, (arrow_pos, LINE_Y - LINE_HEIGHT // 2 - 20), (arrow_pos, LINE_Y + LINE_HEIGHT // 2 + 20), 5)
-        pygame.display.flip()
-        pygame.time.wait(1000)
-
-        chance = ((LINE_PADDING + LINE_WIDTH) - self.cursor_pos) / LINE_WIDTH * 100
-        potential_reward = self.calculate_reward(chance)
-
-        if arrow_pos > self.cursor_pos:
-            win_sound.play()
-            self.reward = potential_reward
-            self.balance += self.reward
-            print(f"Win! Reward: {self.reward:.2f} {self.currency}")
-        else:
-            lose_sound.play()
-            self.balance -= self.bet_amount
-            print("Lose!")
-
-        self.reward = 0
-
-    def change_bet(self, amount):
-        """Increase or decrease the bet amount."""
-        new_bet = max(0.001, self.bet_amount + amount)
-        if new_bet > self.balance:
-            print("Cannot bet more than your current balance!")
-        else:
-            self.bet_amount = new_bet
-
-    def change_currency(self, currency):
-        self.currency = currency
-
-    def convert_currency(self, amount):
-        return amount * conversion_rates[self.currency]
-
-    def draw(self, screen):
-        screen.fill(BG_COLOR)
-        self.draw_line(screen)
-        self.draw_cursor(screen)
-        self.draw_interface(screen)
-
-    def draw_interface(self, screen):
-        pygame.draw.rect(screen, HIDDEN_COLOR, (WIDTH - DASHBOARD_WIDTH, 0, DASHBOARD_WIDTH, HEIGHT))  # Adjusted dashboard size
-
-        balance_text = f"Balance: {self.convert_currency(self.balance):.2f} {self.currency}"
-        bet_text = f"Bet Amount: {self.convert_currency(self.bet_amount):.2f} {self.currency}"
-        chance = ((LINE_PADDING + LINE_WIDTH) - self.cursor_pos) / LINE_WIDTH * 100
-        potential_reward = self.calculate_reward(chance)
-        chance_text = f"Chance (Green): {chance:.1f}%"
-        potential_reward_text = f"Recompense: {self.convert_currency(potential_reward):.2f} {self.currency}"
-
-        y_offset = DASHBOARD_PADDING + 300
-        spacing = 50
-        for idx, text in enumerate([balance_text, bet_text, chance_text, potential_reward_text]):
-            text_surface = font.render(text, True, TEXT_COLOR)
-            screen.blit(text_surface, (WIDTH - DASHBOARD_WIDTH + DASHBOARD_PADDING, y_offset + idx * spacing))
-
-        self.dropdown.draw(screen)
-        for button in self.buttons.values():
-            button.draw(screen)
-
-    def run(self):
-        """Main game loop."""
-        global screen
-        screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Stake Dice Game")
-        clock = pygame.time.Clock()
-
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = event.pos
-                    if LINE_PADDING <= pos[0] <= LINE_PADDING + LINE_WIDTH and LINE_Y - LINE_HEIGHT // 2 <= pos[1] <= LINE_Y + LINE_HEIGHT // 2:
-                        self.holding_cursor = True
-                        bet_sound.play()
-                    else:
-                        for button in self.buttons.values():
-                            button.handle_click(pos)
-                        self.dropdown.handle_click(pos)
-                if event.type == pygame.MOUSEBUTTONUP:
-                    self.holding_cursor = False
-
-            if self.holding_cursor:
-                pos = pygame.mouse.get_pos()
-                self.cursor_pos = max(LINE_PADDING, min(pos[0], LINE_PADDING + LINE_WIDTH))
-
-            for button in self.buttons.values():
-                button.hovered = button.is_hovered(pygame.mouse.get_pos())
-
-            self.draw(screen)
-            pygame.display.flip()
-            clock.tick(30)
-
-        pygame.quit()
-
-
-def run_dice(balance):
-    return StakeDiceGame(balance)
-
+import pygame
+import random
+import sys
+import ui
+import assets
+from collections import deque
+import dice_engine
+from autobet import AutoBet, default_strategy
+from dice_engine import LINE_PADDING, LINE_WIDTH
+
+# Screen dimensions
+WIDTH, HEIGHT = 1100, 700
+LINE_HEIGHT = 20
+LINE_Y = HEIGHT // 2
+CURSOR_WIDTH = 10
+
+# Padding and dimensions
+DASHBOARD_WIDTH = 300
+DASHBOARD_PADDING = 20
+
+# Colors
+BG_COLOR = (24, 26, 27)
+LINE_COLOR = (43, 47, 50)
+GREEN_COLOR = (0, 204, 102)
+RED_COLOR = (220, 20, 60)
+CURSOR_COLOR = (128, 128, 128)
+TEXT_COLOR = (255, 255, 255)
+HIDDEN_COLOR = (24, 24, 24)
+
+# Fonts and sounds, created by load_assets() on first use
+font = small_font = None
+slide_sound = arrow_sound = win_sound = lose_sound = bet_sound = None
+
+# Frame rate cap while something is moving
+MAX_FPS = 30
+
+# Bet animation
+BET_DURATION = 1000  # Milliseconds to show the arrow before a bet is settled
+MAX_QUEUED_BETS = 20
+
+# Conversion rates
+conversion_rates = {
+    "BTC": 1,
+    "ETH": 15,
+    "USD": 100000,
+    "EUR": 93565,
+}
+
+def load_assets():
+    """Initialize pygame and load the fonts and sounds the first time a game is created."""
+    global font, small_font, slide_sound, arrow_sound, win_sound, lose_sound, bet_sound
+    if font is not None:
+        return
+
+    # Initialize Pygame
+    pygame.init()
+
+    # Fonts
+    font = pygame.font.Font(None, 36)
+    small_font = pygame.font.Font(None, 28)
+
+    # Sounds, shared with the other games
+    slide_sound = assets.load_sound("audios/slide.mp3")
+    arrow_sound = assets.load_sound("audios/arrow.mp3")
+    win_sound = assets.load_sound("audios/win.mp3")
+    lose_sound = assets.load_sound("audios/lose.mp3")
+    bet_sound = assets.load_sound("audios/bet.mp3")
+
+class Button:
+    def __init__(self, x, y, width, height, text, action=None, enabled=True):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.text = text
+        self.action = action
+        self.enabled = enabled
+        self.hovered = False
+
+    def draw(self, screen):
+        color = CURSOR_COLOR if self.hovered else GREEN_COLOR if self.enabled else RED_COLOR
+        pygame.draw.rect(screen, color, self.rect, border_radius=8)
+        text_surface = ui.render_label(small_font, self.text, TEXT_COLOR)
+        text_rect = text_surface.get_rect(center=self.rect.center)
+        screen.blit(text_surface, text_rect)
+
+    def is_hovered(self, pos):
+        return self.rect.collidepoint(pos)
+
+    def handle_click(self, pos):
+        if self.enabled and self.is_hovered(pos) and self.action:
+            self.action()
+
+class Dropdown:
+    def __init__(self, x, y, width, height, options, selected_index=0, action=None):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.options = options
+        self.selected_index = selected_index
+        self.expanded = False
+        self.action = action
+
+    def draw(self, screen):
+        pygame.draw.rect(screen, GREEN_COLOR, self.rect, border_radius=8)
+        selected_option = self.options[self.selected_index]
+        text_surface = ui.render_label(small_font, selected_option, TEXT_COLOR)
+        text_rect = text_surface.get_rect(center=self.rect.center)
+        screen.blit(text_surface, text_rect)
+
+        if self.expanded:
+            for i, option in enumerate(self.options):
+                option_rect = pygame.Rect(self.rect.x, self.rect.y + (i + 1) * self.rect.height, self.rect.width, self.rect.height)
+                pygame.draw.rect(screen, GREEN_COLOR, option_rect, border_radius=8)
+                option_text = ui.render_label(small_font, option, TEXT_COLOR)
+                option_text_rect = option_text.get_rect(center=option_rect.center)
+                screen.blit(option_text, option_text_rect)
+
+    def handle_click(self, pos):
+        if self.expanded:
+            for i, option in enumerate(self.options):
+                option_rect = pygame.Rect(self.rect.x, self.rect.y + (i + 1) * self.rect.height, self.rect.width, self.rect.height)
+                if option_rect.collidepoint(pos):
+                    self.selected_index = i
+                    self.expanded = False
+                    if self.action:
+                        self.action(self.options[self.selected_index])
+                    return
+        if self.rect.collidepoint(pos):
+            self.expanded = not self.expanded
+
+class StakeDiceGame:
+    def __init__(self, balance):
+        load_assets()
+        self.balance = balance
+        self.bet_amount = 0.00001
+        self.reward = 0
+        self.cursor_pos = LINE_PADDING + LINE_WIDTH // 2  # Center the cursor on the line
+        self.currency = "EUR"
+        self.holding_cursor = False
+        self.pending_bets = deque()  # (cursor_pos, bet_amount) waiting for the current bet to finish
+        self.active_bet = None  # (cursor_pos, bet_amount, arrow_pos, started_at, duration)
+        self.auto = None
+        self.static_layer = None  # Background, dashboard panel, dropdown and buttons
+        self.static_key = None  # State the static layer was drawn for
+
+        # UI Elements
+        button_width, button_height = 150, 40
+        button_x = WIDTH - DASHBOARD_WIDTH + DASHBOARD_PADDING
+        self.dropdown = Dropdown(940, DASHBOARD_PADDING, button_width, button_height, ["BTC", "ETH", "USD", "EUR"], action=self.change_currency)
+        self.buttons = {
+            "bet": Button(button_x, DASHBOARD_PADDING + 80, button_width, button_height, "Bet", self.bet),
+            "increase_bet": Button(button_x, DASHBOARD_PADDING + 140, button_width, button_height, "+ Bet", lambda: self.change_bet(0.0001)),
+            "decrease_bet": Button(button_x, DASHBOARD_PADDING + 200, button_width, button_height, "- Bet", lambda: self.change_bet(-0.0001)),
+            "auto": Button(button_x, DASHBOARD_PADDING + 260, button_width, button_height, "Auto", self.toggle_auto),
+        }
+
+    def draw_line(self, screen):
+        """Draw the main horizontal line with red and green sides."""
+        line_start_x = LINE_PADDING
+        line_end_x = line_start_x + LINE_WIDTH
+
+        mid_x = self.cursor_pos  # Midpoint divides red and green sections
+        pygame.draw.line(screen, RED_COLOR, (line_start_x, LINE_Y), (mid_x, LINE_Y), LINE_HEIGHT)
+        pygame.draw.line(screen, GREEN_COLOR, (mid_x, LINE_Y), (line_end_x, LINE_Y), LINE_HEIGHT)
+
+    def draw_cursor(self, screen):
+        """Draw the cursor on the line."""
+        cursor_rect = pygame.Rect(self.cursor_pos - CURSOR_WIDTH // 2, LINE_Y - LINE_HEIGHT // 2 - 20, CURSOR_WIDTH, LINE_HEIGHT + 40)
+        pygame.draw.rect(screen, CURSOR_COLOR, cursor_rect, border_radius=8)
+        percentage = (self.cursor_pos - LINE_PADDING) / LINE_WIDTH * 100
+        text_surface = ui.render_text(font, f"{percentage:.1f}%", TEXT_COLOR)
+        text_rect = text_surface.get_rect(center=(self.cursor_pos, LINE_Y - 40))
+        screen.blit(text_surface, text_rect)
+
+    def calculate_reward(self, chance):
+        """Calculate the reward based on the chance."""
+        return float(dice_engine.rewards(self.bet_amount, chance))
+
+    def committed(self):
+        """Amount staked by the bets that are queued or still animating."""
+        total = sum(amount for _, amount in self.pending_bets)
+        if self.active_bet:
+            total += self.active_bet[1]
+        return total
+
+    def bet(self):
+        """Queue a bet at the current cursor position; update() plays it out."""
+        if self.bet_amount > self.balance - self.committed():
+            print("Cannot bet more than your current balance!")
+            return
+        if len(self.pending_bets) >= MAX_QUEUED_BETS:
+            return
+        self.pending_bets.append((self.cursor_pos, self.bet_amount))
+
+    def toggle_auto(self):
+        """Start auto-betting with the current bet amount, or stop it."""
+        if self.auto and self.auto.running:
+            self.auto.running = False
+        else:
+            self.auto = AutoBet(default_strategy(self.bet_amount, self.balance))
+
+    def update(self, now):
+        """Advance the bet state machine to time `now` (milliseconds)."""
+        if self.active_bet and now - self.active_bet[3] >= self.active_bet[4]:
+            self.settle_bet()
+        if self.auto and self.active_bet is None and not self.pending_bets:
+            amount = self.auto.next_bet(self.balance)
+            if amount is not None:
+                self.pending_bets.append((self.cursor_pos, amount))
+        if self.active_bet is None and self.pending_bets:
+            cursor_pos, amount = self.pending_bets.popleft()
+            arrow_pos = random.randint(LINE_PADDING, LINE_PADDING + LINE_WIDTH)
+            # Bets waiting in the queue shorten the animation so they never fall behind
+            duration = BET_DURATION // (1 + len(self.pending_bets))
+            self.active_bet = (cursor_pos, amount, arrow_pos, now, duration)
+            arrow_sound.play()
+
+    def settle_bet(self):
+        cursor_pos, amount, arrow_pos, _, _ = self.active_bet
+        self.active_bet = None
+        net, balances, _ = dice_engine.settle([cursor_pos], [amount], [arrow_pos], self.balance)
+        self.balance = float(balances[0])
+        if self.auto and self.auto.running:
+            self.auto.record(float(net[0]))
+
+        if arrow_pos > cursor_pos:
+            win_sound.play()
+            self.reward = float(net[0])
+            print(f"Win! Reward: {self.reward:.2f} {self.currency}")
+        else:
+            lose_sound.play()
+            print("Lose!")
+
+        self.reward = 0
+
+    def finish_bets(self):
+        """Settle the current and queued bets immediately, e.g. when the window closes."""
+        while self.active_bet or self.pending_bets:
+            if self.active_bet is None:
+                self.update(0)
+            self.settle_bet()
+
+    def draw_arrow(self, screen, now):
+        """Slide the arrow of the current bet from the start of the line to where it landed."""
+        if not self.active_bet:
+            return
+        _, _, arrow_pos, started_at, duration = self.active_bet
+        progress = min(1, (now - started_at) / max(1, duration * 0.6))
+        x = LINE_PADDING + (arrow_pos - LINE_PADDING) * (1 - (1 - progress) ** 2)
+        pygame.draw.line(screen, CURSOR_COLOR, (x, LINE_Y - LINE_HEIGHT // 2 - 20), (x, LINE_Y + LINE_HEIGHT // 2 + 20), 5)
+
+    def change_bet(self, amount):
+        """Increase or decrease the bet amount."""
+        new_bet = max(0.001, self.bet_amount + amount)
+        if new_bet > self.balance:
+            print("Cannot bet more than your current balance!")
+        else:
+            self.bet_amount = new_bet
+
+    def change_currency(self, currency):
+        self.currency = currency
+
+    def convert_currency(self, amount):
+        return amount * conversion_rates[self.currency]
+
+    def draw(self, screen):
+        key = (self.currency, self.dropdown.expanded, self.dropdown.selected_index,
+               tuple((button.hovered, button.enabled) for button in self.buttons.values()))
+        if key != self.static_key or self.static_layer is None or self.static_layer.get_size() != screen.get_size():
+            self.static_layer = self.draw_static_layer(screen.copy())
+            self.static_key = key
+        screen.blit(self.static_layer, (0, 0))
+        self.draw_line(screen)
+        self.draw_cursor(screen)
+        self.draw_arrow(screen, pygame.time.get_ticks())
+        self.draw_interface(screen)
+
+    def draw_static_layer(self, layer):
+        """Draw everything that only changes on events (hover, currency, dropdown) onto `layer`."""
+        layer.fill(BG_COLOR)
+        pygame.draw.rect(layer, HIDDEN_COLOR, (WIDTH - DASHBOARD_WIDTH, 0, DASHBOARD_WIDTH, HEIGHT))  # Adjusted dashboard size
+        self.dropdown.draw(layer)
+        for button in self.buttons.values():
+            button.draw(layer)
+        return layer
+
+    def draw_interface(self, screen):
+        balance_text = f"Balance: {self.convert_currency(self.balance):.2f} {self.currency}"
+        bet_text = f"Bet Amount: {self.convert_currency(self.bet_amount):.2f} {self.currency}"
+        chance = float(dice_engine.chances(self.cursor_pos))
+        potential_reward = self.calculate_reward(chance)
+        chance_text = f"Chance (Green): {chance:.1f}%"
+        potential_reward_text = f"Recompense: {self.convert_currency(potential_reward):.2f} {self.currency}"
+
+        y_offset = DASHBOARD_PADDING + 300
+        spacing = 50
+        texts = [balance_text, bet_text, chance_text, potential_reward_text]
+        if self.auto:
+            texts.append(self.auto.status())
+        for idx, text in enumerate(texts):
+            text_surface = ui.render_text(font, text, TEXT_COLOR)
+            screen.blit(text_surface, (WIDTH - DASHBOARD_WIDTH + DASHBOARD_PADDING, y_offset + idx * spacing))
+
+    def is_animating(self):
+        """Whether the screen changes without input: a drag, a bet in flight or auto-betting."""
+        return bool(self.holding_cursor or self.active_bet or self.pending_bets or (self.auto and self.auto.running))
+
+    def run(self, max_fps=MAX_FPS):
+        """Main game loop."""
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Stake Dice Game")
+        clock = pygame.time.Clock()
+
+        events = []
+        running = True
+        while running:
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    pos = event.pos
+                    if LINE_PADDING <= pos[0] <= LINE_PADDING + LINE_WIDTH and LINE_Y - LINE_HEIGHT // 2 <= pos[1] <= LINE_Y + LINE_HEIGHT // 2:
+                        self.holding_cursor = True
+                        bet_sound.play()
+                    else:
+                        for button in self.buttons.values():
+                            button.handle_click(pos)
+                        self.dropdown.handle_click(pos)
+                if event.type == pygame.MOUSEBUTTONUP:
+                    self.holding_cursor = False
+
+            if self.holding_cursor:
+                pos = pygame.mouse.get_pos()
+                self.cursor_pos = max(LINE_PADDING, min(pos[0], LINE_PADDING + LINE_WIDTH))
+
+            for button in self.buttons.values():
+                button.hovered = button.is_hovered(pygame.mouse.get_pos())
+
+            self.update(pygame.time.get_ticks())
+            self.draw(screen)
+            pygame.display.flip()
+            events = ui.next_events(clock, self.is_animating(), max_fps)
+
+        self.finish_bets()
+        pygame.display.quit()  # Keep pygame, fonts and shared sounds alive for the next game
+
+
+def run_dice(balance):
+    return StakeDiceGame(balance)
+
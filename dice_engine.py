@@ -0,0 +1,68 @@
+import numpy as np
+
+
+LINE_WIDTH = 600
+LINE_PADDING = 40
+LINE_START = LINE_PADDING
+LINE_END = LINE_PADDING + LINE_WIDTH
+
+
+def chances(cursors):
+    """Chance of winning, in percent, shown for each cursor position."""
+    return (LINE_END - np.asarray(cursors, dtype=np.float64)) / LINE_WIDTH * 100
+
+
+def rewards(amounts, chance):
+    """Amount won by each bet at the given chance (same rule as the game: 0.95x at 50%)."""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    chance = np.asarray(chance, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(chance == 50, amounts * 0.95,
+                        np.where(chance != 0, (amounts / (chance / 95)) / 2, 0.0))
+
+
+def draw_arrows(rng, count):
+    """Random arrow positions, uniform over every pixel of the line like random.randint."""
+    return rng.integers(LINE_START, LINE_END + 1, count)
+
+
+# Payout curve for every integer cursor pixel on the line
+CURSORS = np.arange(LINE_START, LINE_END + 1)
+CHANCES = chances(CURSORS)
+MULTIPLIERS = rewards(1.0, CHANCES)  # Reward per unit bet
+WIN_PROBABILITY = (LINE_END - CURSORS) / (LINE_WIDTH + 1)  # P(arrow > cursor)
+EXPECTED_RETURN = WIN_PROBABILITY * MULTIPLIERS - (1 - WIN_PROBABILITY)  # Per unit bet
+
+
+def settle(cursors, amounts, arrows, balance):
+    """Settle a sequence of bets.
+
+    Returns the net result of each bet, the balance after each bet and which
+    bets were accepted. As in the game, a bet larger than the current balance
+    is refused and leaves the balance unchanged.
+    """
+    cursors = np.asarray(cursors)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    won = np.asarray(arrows) > cursors
+    net = np.where(won, rewards(amounts, chances(cursors)), -amounts)
+    accepted = np.ones(len(amounts), dtype=bool)
+
+    # Refusals depend on the running balance: settle up to the first refused bet,
+    # skip every following bet the balance still cannot cover, and carry on from there.
+    balances = np.empty(len(amounts))
+    start = 0
+    while start < len(amounts):
+        running = balance + np.cumsum(net[start:])
+        refused = np.flatnonzero(amounts[start:] > running - net[start:])
+        end = start + refused[0] if len(refused) else len(amounts)
+        balances[start:end] = running[:end - start]
+        balance = balances[end - 1] if end > start else balance
+        if end == len(amounts):
+            break
+        affordable = np.flatnonzero(amounts[end:] <= balance)
+        resume = end + affordable[0] if len(affordable) else len(amounts)
+        accepted[end:resume] = False
+        net[end:resume] = 0
+        balances[end:resume] = balance
+        start = resume
+    return net, balances, accepted
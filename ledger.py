@@ -0,0 +1,295 @@
+import bisect
+import csv
+import itertools
+import json
+import threading
+import time
+from array import array
+
+import numpy as np
+
+
+# Running total stored every CHECKPOINT_EVERY transactions of an account
+CHECKPOINT_EVERY = 64
+
+
+class Ledger:
+    """Every transaction of the bank in parallel typed columns, about 30 bytes each.
+
+    Row i is (accounts[i], descriptions[i], amounts[i], times[i]); descriptions
+    are interned. Each account keeps the row numbers of its own transactions
+    and the running total of its amounts every CHECKPOINT_EVERY rows, so
+    per-account queries never look at the other accounts' rows.
+
+    Writers are serialized by a lock. Readers do not take it: a row only
+    becomes visible, through its account's index and through `published`,
+    once every column holds it.
+    """
+
+    def __init__(self):
+        self.accounts = array("I")  # Account number of each row
+        self.descriptions = array("I")  # Index into self.strings
+        self.amounts = array("d")
+        self.times = array("d")  # Unix time, 0 when unknown
+        self.strings = []
+        self.string_ids = {}
+        self.account_ids = {}  # user_id -> account number
+        self.user_ids = []  # account number -> user_id
+        self.offsets = []  # account number -> array of its row numbers
+        self.checkpoints = []  # account number -> array of running totals
+        self.totals = array("d")  # account number -> sum of all its amounts
+        self.published = 0  # Rows every column holds; scans over all rows stop there
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.published
+
+    def account(self, user_id):
+        account = self.account_ids.get(user_id)
+        if account is None:
+            account = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.offsets.append(array("I"))
+            self.checkpoints.append(array("d", [0.0]))
+            self.totals.append(0.0)
+            self.account_ids[user_id] = account
+        return account
+
+    def intern(self, description):
+        string_id = self.string_ids.get(description)
+        if string_id is None:
+            string_id = self.string_ids[description] = len(self.strings)
+            self.strings.append(description)
+        return string_id
+
+    def append(self, user_id, description, amount, when=None):
+        when = time.time() if when is None else when
+        with self.lock:
+            self.add(user_id, self.intern(description), amount, when)
+            self.published = len(self.amounts)
+
+    def append_many(self, rows, when=None):
+        """Append (user_id, description, amount) rows at the same time, taking the lock once."""
+        when = time.time() if when is None else when
+        with self.lock:
+            for user_id, description, amount in rows:
+                self.add(user_id, self.intern(description), amount, when)
+            self.published = len(self.amounts)
+
+    def append_column(self, user_ids, description, amounts, when=None):
+        """Append one row to each of the distinct accounts `user_ids`, all with the same description and time.
+
+        The columns are extended in bulk and the totals added with NumPy, so
+        only the per-account indexes are touched row by row. Returns the
+        number of rows each account had before.
+        """
+        when = time.time() if when is None else when
+        with self.lock:
+            string_id = self.intern(description)
+            accounts = list(map(self.account_ids.get, user_ids))
+            if None in accounts:
+                accounts = [self.account(user_id) if account is None else account
+                            for user_id, account in zip(user_ids, accounts)]
+            rows = list(map(self.offsets.__getitem__, accounts))
+            counts = list(map(len, rows))
+            first = len(self.amounts)
+
+            # Keep each account sorted by time
+            last = np.array([positions[-1] if positions else -1 for positions in rows], dtype=np.intp)
+            stamps = np.full(len(accounts), when)
+            earlier = last >= 0
+            if earlier.any():
+                stamps[earlier] = np.maximum(when, np.frombuffer(self.times, dtype=np.float64)[last[earlier]])
+            self.accounts.extend(array("I", accounts))
+            self.descriptions.extend(array("I", [string_id]) * len(accounts))
+            self.amounts.extend(array("d", amounts))
+            self.times.frombytes(stamps.tobytes())
+
+            totals = np.frombuffer(self.totals, dtype=np.float64)  # Released below, before the column can grow
+            indices = np.array(accounts, dtype=np.intp)
+            totals[indices] += np.asarray(amounts, dtype=np.float64)
+            for account in indices[(np.array(counts) + 1) % CHECKPOINT_EVERY == 0].tolist():
+                self.checkpoints[account].append(totals[account])
+            del totals
+
+            for positions, position in zip(rows, range(first, first + len(rows))):
+                positions.append(position)
+            self.published = first + len(rows)
+        return counts
+
+    def add(self, user_id, string_id, amount, when):
+        """Write one row; the caller holds the lock and publishes it."""
+        account = self.account_ids.get(user_id)
+        if account is None:
+            account = self.account(user_id)
+        positions = self.offsets[account]
+        if positions:
+            when = max(when, self.times[positions[-1]])  # Keep each account sorted by time
+        self.accounts.append(account)
+        self.descriptions.append(string_id)
+        self.amounts.append(amount)
+        self.times.append(when)
+        self.totals[account] += amount
+        if (len(positions) + 1) % CHECKPOINT_EVERY == 0:
+            self.checkpoints[account].append(self.totals[account])
+        positions.append(len(self.amounts) - 1)
+
+    def extend(self, user_id, transactions):
+        """Append transactions given as {"description", "amount"[, "time"]} dicts."""
+        for transaction in transactions:
+            self.append(user_id, transaction["description"], transaction["amount"], transaction.get("time", 0.0))
+
+    def close(self, user_id):
+        """Forget the account of a deleted user; its rows stay in the ledger."""
+        self.account_ids.pop(user_id, None)
+
+    def count(self, user_id):
+        account = self.account_ids.get(user_id)
+        return 0 if account is None else len(self.offsets[account])
+
+    def row(self, position):
+        return {
+            "description": self.strings[self.descriptions[position]],
+            "amount": self.amounts[position],
+            "time": self.times[position],
+        }
+
+    def history(self, user_id, start=0, stop=None):
+        """Transactions of `user_id` from its `start`-th to its `stop`-th, as dicts."""
+        account = self.account_ids.get(user_id)
+        if account is None:
+            return []
+        return [self.row(position) for position in self.offsets[account][start:stop]]
+
+    def records(self, user_id, start=0):
+        """(description, amount, time) of the transactions of `user_id` from its `start`-th on."""
+        account = self.account_ids.get(user_id)
+        if account is None:
+            return []
+        strings, descriptions, amounts, times = self.strings, self.descriptions, self.amounts, self.times
+        return [(strings[descriptions[position]], amounts[position], times[position])
+                for position in self.offsets[account][start:]]
+
+    def columns(self, user_id):
+        """Transactions of `user_id` as columns: its distinct descriptions, then arrays of indexes into them, amounts and times."""
+        account = self.account_ids.get(user_id)
+        positions = self.offsets[account][:] if account is not None else array("I")  # Copy: rows added meanwhile wait
+        string_ids = array("I", map(self.descriptions.__getitem__, positions))
+        local = {string_id: index for index, string_id in enumerate(dict.fromkeys(string_ids))}
+        return (list(map(self.strings.__getitem__, local)), array("I", map(local.__getitem__, string_ids)),
+                array("d", map(self.amounts.__getitem__, positions)), array("d", map(self.times.__getitem__, positions)))
+
+    def running_total(self, account, count):
+        """Sum of the first `count` amounts of an account."""
+        block = count // CHECKPOINT_EVERY
+        amounts = self.amounts
+        positions = self.offsets[account]
+        return self.checkpoints[account][block] + sum(
+            amounts[positions[i]] for i in range(block * CHECKPOINT_EVERY, count))
+
+    def position_at(self, account, when):
+        """Number of transactions of an account made at or before `when`."""
+        return bisect.bisect_right(self.offsets[account], when, key=self.times.__getitem__)
+
+    def total(self, user_id, start=None, end=None):
+        """Sum of the amounts of `user_id` with a time in [start, end]."""
+        account = self.account_ids.get(user_id)
+        if account is None:
+            return 0.0
+        positions = self.offsets[account]
+        last = len(positions) if end is None else self.position_at(account, end)
+        first = 0 if start is None else bisect.bisect_left(positions, start, key=self.times.__getitem__)
+        if first >= last:
+            return 0.0
+        return self.running_total(account, last) - self.running_total(account, first)
+
+    def balance_at(self, user_id, when, balance):
+        """Balance `user_id` had at `when`, given its current `balance`, assuming every change since was logged."""
+        account = self.account_ids.get(user_id)
+        if account is None:
+            return balance
+        return balance - (self.totals[account] - self.running_total(account, self.position_at(account, when)))
+
+    def nbytes(self):
+        """Memory held by the columns and the per-account indexes."""
+        columns = (self.accounts, self.descriptions, self.amounts, self.times, self.totals)
+        indexes = self.offsets + self.checkpoints
+        return sum(column.itemsize * len(column) for column in (*columns, *indexes))
+
+    def query(self, user_id=None, start=None, end=None, min_amount=None, max_amount=None, description=None,
+              after=None, newest_first=False):
+        """Yield the matching transactions one at a time, as dicts with their row number as "cursor".
+
+        Filters on the account, the time range [start, end], the amount range
+        and a case-insensitive substring of the description. Pass the last
+        cursor seen as `after` to resume from the next row.
+        """
+        if user_id is None:
+            positions = range(self.published)
+            lo, hi = 0, len(positions)
+        else:
+            account = self.account_ids.get(user_id)
+            if account is None:
+                return
+            positions = self.offsets[account]
+            # An account's rows are sorted by time, so the time range is a slice
+            lo = 0 if start is None else bisect.bisect_left(positions, start, key=self.times.__getitem__)
+            hi = len(positions) if end is None else bisect.bisect_right(positions, end, key=self.times.__getitem__)
+        if after is not None and lo < hi:
+            if newest_first:
+                hi = bisect.bisect_left(positions, after, lo, hi)
+            else:
+                lo = bisect.bisect_right(positions, after, lo, hi)
+        indices = range(lo, hi)
+        if newest_first:
+            indices = reversed(indices)
+
+        wanted = None
+        if description is not None:
+            needle = description.lower()
+            wanted = {string_id for string_id, string in enumerate(self.strings) if needle in string.lower()}
+        for i in indices:
+            position = positions[i]
+            amount = self.amounts[position]
+            when = self.times[position]
+            if (start is not None and when < start or end is not None and when > end
+                    or min_amount is not None and amount < min_amount
+                    or max_amount is not None and amount > max_amount
+                    or wanted is not None and self.descriptions[position] not in wanted):
+                continue
+            transaction = self.row(position)
+            transaction["user_id"] = self.user_ids[self.accounts[position]]
+            transaction["cursor"] = position
+            yield transaction
+
+    def page(self, limit=20, **filters):
+        """The next `limit` matching transactions and the cursor to pass as `after` for the page after, or None."""
+        return page(self.query(**filters), limit)
+
+
+def page(transactions, limit):
+    """The first `limit` transactions of a query and the cursor to resume after them, or None at the end."""
+    transactions = list(itertools.islice(transactions, limit))
+    cursor = transactions[-1]["cursor"] if len(transactions) == limit else None
+    return transactions, cursor
+
+
+EXPORT_FIELDS = ("cursor", "user_id", "time", "description", "amount")
+
+
+def export_csv(transactions, file):
+    """Write transactions to a CSV file as they come; returns how many were written."""
+    writer = csv.writer(file)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for count, transaction in enumerate(transactions, 1):
+        writer.writerow([transaction[field] for field in EXPORT_FIELDS])
+    return count
+
+
+def export_jsonl(transactions, file):
+    """Write transactions as one JSON object per line; returns how many were written."""
+    count = 0
+    for count, transaction in enumerate(transactions, 1):
+        file.write(json.dumps({field: transaction[field] for field in EXPORT_FIELDS}, ensure_ascii=False) + "\n")
+    return count
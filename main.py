@@ -1,29 +1,45 @@
 # File: x_bank.py
 
-import msvcrt
+try:
+    import msvcrt
+except ImportError:  # Only the console menus need it; server.py runs anywhere
+    msvcrt = None
+import contextlib
 import os
 import random
 import hashlib
-import json
 import time
 import sys
 import threading
-import pygame
+from operator import attrgetter, methodcaller
+import numpy as np
 from colorama import Fore, Style, init
-from datetime import datetime, timedelta
-#import plotext as plt
+import batch
+import charts
+from autobet import FlatBet, HeadlessDice, Martingale, StopLimits
+from ledger import Ledger, export_csv, export_jsonl, page
+import market
+from scheduler import LoanScheduler
+from settlement import INSUFFICIENT, PAID_OFF, REPAID, settle
+from storage import JournalStore, SqliteStore
 
+# Transactions printed per page of history
+TRANSACTIONS_PER_PAGE = 20
 
 
 
 
 
 
-init(autoreset=True)  # Ensures color reset after each output
+
+
+
+class BankError(Exception):
+    """An operation the bank refuses; the message is meant for the user."""
 
 
 class User:
-    def __init__(self, name, surname, password, age, user_id, permissions=1, balance=0, wallet=None, trust=100, loans=None, can_delete=True, code=None,transaction_history=None):
+    def __init__(self, name, surname, password, age, user_id, permissions=1, balance=0, wallet=None, trust=100, loans=None, can_delete=True, code=None,transaction_history=None, ledger=None):
         self.name = name
         self.surname = surname
         self.password = password
@@ -36,41 +52,119 @@ class User:
         self.can_delete = can_delete
         self.code = code
         self.trust = trust
-        self.transaction_history = transaction_history or []
+        self._ledger = ledger if ledger is not None else Ledger()
+        self._lock = threading.Lock()  # Taken through Bank.locked()
+        self._ledger.extend(user_id, transaction_history or [])
+
+    @property
+    def transaction_history(self):
+        return self._ledger.history(self.user_id)
+
+    @property
+    def transaction_count(self):
+        return self._ledger.count(self.user_id)
+
+    def transactions_since(self, start):
+        """(description, amount, time) of the transactions logged after the first `start` ones."""
+        return self._ledger.records(self.user_id, start)
 
     def check_delete(self):
         return self.balance == 0 and not self.wallet
 
     def log_transaction(self, description, amount):
-        self.transaction_history.append({"description": description, "amount": amount})
+        self._ledger.append(self.user_id, description, amount)
 
-    def to_dict(self):
-        return vars(self)
+    def history_columns(self):
+        """The transactions as columns, see Ledger.columns."""
+        return self._ledger.columns(self.user_id)
+
+    def to_dict(self, history=True):
+        # Dicts are copied so that another thread changing them cannot break the serialization
+        data = {key: dict(value) if isinstance(value, dict) else value
+                for key, value in vars(self).items() if not key.startswith("_")}
+        if history:
+            data["transaction_history"] = self.transaction_history
+        return data
 
     @staticmethod
-    def from_dict(data):
-        return User(**data)
+    def from_dict(data, ledger=None):
+        return User(**data, ledger=ledger)
 
 
 class Bank:
-    def __init__(self, name="X Bank"):
+    def __init__(self, name="X Bank", store=None):
         self.name = name
-        self.users = []
+        self.store = store or JournalStore()
+        self.ledger = Ledger()  # Transactions of every user
+        self.users = {}  # user_id -> User
+        self.users_by_name = {}  # (name, surname) -> [User, ...]
+        self.names_fetched = set()  # Names already looked up in a lazy store
         self.load_users()
         self.current_user = None
-        self.loan_threads = {}
+        self.loan_scheduler = LoanScheduler(self.repay_loans)
 
     def load_users(self):
-        if os.path.exists("files/credentials.json"):
-            with open("files/credentials.json", "r") as file:
-                users_data = json.load(file)
-                self.users = [User.from_dict(user) for user in users_data]
-        else:
-            self.users = []
+        self.users = {}
+        self.users_by_name = {}
+        self.ledger = Ledger()
+        for data in self.store.load():
+            self.index_user(User.from_dict(data, self.ledger))
+
+    def index_user(self, user):
+        self.users[user.user_id] = user
+        self.users_by_name.setdefault((user.name, user.surname), []).append(user)
+
+    def get_user(self, user_id):
+        user = self.users.get(user_id)
+        if user is None and self.store.lazy:
+            data = self.store.fetch_by_id(user_id)
+            if data:
+                user = User.from_dict(data, self.ledger)
+                self.index_user(user)
+        return user
+
+    def users_named(self, name, surname):
+        key = (name, surname)
+        if self.store.lazy and key not in self.names_fetched:
+            for data in self.store.fetch_by_name(name, surname):
+                if data["user_id"] not in self.users:
+                    self.index_user(User.from_dict(data, self.ledger))
+            self.names_fetched.add(key)
+        return self.users_by_name.get(key, ())
+
+    def unindex_user(self, user):
+        del self.users[user.user_id]
+        homonyms = self.users_by_name[(user.name, user.surname)]
+        homonyms.remove(user)
+        if not homonyms:
+            del self.users_by_name[(user.name, user.surname)]
 
-    def save_users(self):
-        with open("files/credentials.json", "w") as file:
-            json.dump([user.to_dict() for user in self.users], file, indent=4)
+    @staticmethod
+    def lock_order(*users):
+        """Locks of the given users in user_id order, the order every caller takes them in so that none can deadlock."""
+        return [user._lock for user in sorted(set(users), key=lambda user: user.user_id)]
+
+    @contextlib.contextmanager
+    def locked(self, *users):
+        """Hold the locks of the given users, taken in lock_order."""
+        locks = self.lock_order(*users)
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def save_users(self, *users):
+        """Journal the changes made to the given users, compacting the journal when it gets too large."""
+        if self.store.will_compact(users):
+            # The snapshot holds these changes too: skip journaling what it would discard
+            self.store.snapshot(list(self.users.values()))
+            return
+        self.store.update(users)
+        if self.store.should_compact():
+            self.store.snapshot(list(self.users.values()))
 
     def clear_screen(self):
         os.system("cls" if os.name == "nt" else "clear")
@@ -97,13 +191,16 @@ class Bank:
         print(logo)
         print(Fore.LIGHTBLUE_EX + "-" * 60)
 
+    def show_main_menu(self):
+        self.display_logo()
+        print(Fore.LIGHTBLUE_EX + "1. Ouvrir un compte")
+        print(Fore.LIGHTBLUE_EX + "2. Se connecter")
+        print(Fore.LIGHTBLUE_EX + "3. Quitter")
+        print(Fore.LIGHTBLUE_EX + "-" * 60)
+
     def main_menu(self):
         while True:
-            self.display_logo()
-            print(Fore.LIGHTBLUE_EX + "1. Ouvrir un compte")
-            print(Fore.LIGHTBLUE_EX + "2. Se connecter")
-            print(Fore.LIGHTBLUE_EX + "3. Quitter")
-            print(Fore.LIGHTBLUE_EX + "-" * 60)
+            self.show_main_menu()
             choice = input(Fore.LIGHTBLUE_EX + "Choisissez une option: ")
             self.clear_screen()
             if choice == "1":
@@ -133,11 +230,14 @@ class Bank:
         age = int(input(Fore.LIGHTBLUE_EX + "Entrez votre âge: "))
         if 13 <= age <= 123:
             user_id = name[0] + str(random.randint(1000, 9999)) + surname[-1]
+            while self.get_user(user_id):
+                user_id = name[0] + str(random.randint(1000, 9999)) + surname[-1]
             code = random.randint(1000, 9999)
             hashed_pwd = hashlib.md5(pwd.encode()).hexdigest()
             permissions = 0 if name.lower() == "admin" else 1
-            new_user = User(name, surname, hashed_pwd, age, user_id, permissions, code=code)
-            self.users.append(new_user)
+            new_user = User(name, surname, hashed_pwd, age, user_id, permissions, code=code, ledger=self.ledger)
+            self.index_user(new_user)
+            self.store.create(new_user)
             self.save_users()
             print(Fore.LIGHTBLUE_EX + f"Compte créé avec succès! Votre ID: {user_id}")
             self.fake_loading_bar("Finalisation")
@@ -151,19 +251,25 @@ class Bank:
         name = input(Fore.LIGHTBLUE_EX + "Entrez votre nom: ")
         surname = input(Fore.LIGHTBLUE_EX + "Entrez votre prénom: ")
         pwd = input(Fore.LIGHTBLUE_EX + "Entrez votre mot de passe: ")
-        hashed_pwd = hashlib.md5(pwd.encode()).hexdigest()
-        for user in self.users:
-            if user.name == name and user.surname == surname and user.password == hashed_pwd:
-                self.current_user = user
-                self.fake_loading_bar("Connexion en cours")
-                if self.current_user.permissions == 0:
-                    self.admin_dashboard()
-                else:
-                    self.user_dashboard()
-                return
+        user = self.authenticate(name, surname, pwd)
+        if user:
+            self.current_user = user
+            self.fake_loading_bar("Connexion en cours")
+            if self.current_user.permissions == 0:
+                self.admin_dashboard()
+            else:
+                self.user_dashboard()
+            return
         print(Fore.LIGHTBLUE_EX + "Identifiants incorrects!")
         msvcrt.getch()
 
+    def authenticate(self, name, surname, pwd):
+        hashed_pwd = hashlib.md5(pwd.encode()).hexdigest()
+        for user in self.users_named(name, surname):
+            if user.password == hashed_pwd:
+                return user
+        return None
+
     def admin_dashboard(self):
         while True:
             self.display_logo()
@@ -171,7 +277,8 @@ class Bank:
             print(Fore.LIGHTBLUE_EX + "1. Supprimer un compte")
             print(Fore.LIGHTBLUE_EX + "2. Modifier un solde")
             print(Fore.LIGHTBLUE_EX + "3. Voir les transactions")
-            print(Fore.LIGHTBLUE_EX + "4. Quitter")
+            print(Fore.LIGHTBLUE_EX + "4. Importer des virements")
+            print(Fore.LIGHTBLUE_EX + "5. Quitter")
             choice = input(Fore.LIGHTBLUE_EX + "Choisissez une option: ")
             self.clear_screen()
             if choice == "1":
@@ -179,8 +286,10 @@ class Bank:
             elif choice == "2":
                 self.modify_balance()
             elif choice == "3":
-                self.view_transactions()
+                self.admin_transactions()
             elif choice == "4":
+                self.import_transfers()
+            elif choice == "5":
                 self.current_user = None
                 break
             else:
@@ -188,26 +297,31 @@ class Bank:
 
     def delete_account(self):
         user_id = input(Fore.LIGHTBLUE_EX + "Entrez l'ID de l'utilisateur à supprimer: ")
-        for user in self.users:
-            if user.user_id == user_id:
-                if user.permissions == 0:
-                    print(Fore.LIGHTBLUE_EX + "Impossible de supprimer un administrateur!")
-                    return
-                self.users.remove(user)
-                self.save_users()
-                print(Fore.LIGHTBLUE_EX + f"L'utilisateur {user_id} a été supprimé.")
+        user = self.get_user(user_id)
+        if user:
+            if user.permissions == 0:
+                print(Fore.LIGHTBLUE_EX + "Impossible de supprimer un administrateur!")
                 return
+            self.unindex_user(user)
+            self.ledger.close(user_id)
+            self.store.delete(user_id)
+            self.save_users()
+            print(Fore.LIGHTBLUE_EX + f"L'utilisateur {user_id} a été supprimé.")
+            return
         print(Fore.LIGHTBLUE_EX + "Utilisateur non trouvé.")
 
     def modify_balance(self):
         user_id = input(Fore.LIGHTBLUE_EX + "Entrez l'ID de l'utilisateur: ")
-        for user in self.users:
-            if user.user_id == user_id:
-                amount = float(input(Fore.LIGHTBLUE_EX + "Entrez le nouveau solde: "))
+        user = self.get_user(user_id)
+        if user:
+            amount = float(input(Fore.LIGHTBLUE_EX + "Entrez le nouveau solde: "))
+            with self.locked(user):
+                if amount != user.balance:
+                    user.log_transaction("Ajustement administrateur", amount - user.balance)
                 user.balance = amount
-                self.save_users()
-                print(Fore.LIGHTBLUE_EX + f"Le solde de l'utilisateur {user_id} a été modifié.")
-                return
+                self.save_users(user)
+            print(Fore.LIGHTBLUE_EX + f"Le solde de l'utilisateur {user_id} a été modifié.")
+            return
         print(Fore.LIGHTBLUE_EX + "Utilisateur non trouvé.")
 
     def view_transactions(self):
@@ -218,14 +332,98 @@ class Bank:
             return
 
         print(Fore.LIGHTBLUE_EX + "Historique des transactions:")
-        if not self.current_user.transaction_history:
+        self.print_transactions(user_id=self.current_user.user_id)
+
+        print(Fore.LIGHTBLUE_EX + "Appuyez sur une touche pour continuer...")
+        msvcrt.getch()  # Wait for key press
+
+    def query_transactions(self, **filters):
+        """Yield the matching transactions; a lazy store searches them itself, since the ledger only holds loaded users."""
+        if self.store.lazy:
+            return self.store.query(**filters)
+        return self.ledger.query(**filters)
+
+    def print_transactions(self, **filters):
+        """Print the matching transactions newest first, one page at a time."""
+        cursor = None
+        shown = 0
+        while True:
+            transactions, cursor = page(self.query_transactions(after=cursor, newest_first=True, **filters),
+                                        TRANSACTIONS_PER_PAGE)
+            for transaction in transactions:
+                day = time.strftime("%d/%m/%Y %H:%M", time.localtime(transaction["time"])) if transaction["time"] else "--"
+                owner = "" if "user_id" in filters else f"[{transaction['user_id']}] "
+                print(Fore.LIGHTBLUE_EX + f"{day}  {owner}{transaction['description']}: {transaction['amount']}")
+            shown += len(transactions)
+            if cursor is None:
+                break
+            print(Fore.LIGHTBLUE_EX + "Appuyez sur une touche pour la page suivante, Échap pour arrêter...")
+            if msvcrt.getch() == b"\x1b":
+                break
+        if not shown:
             print(Fore.LIGHTBLUE_EX + "Aucune transaction trouvée.")
+
+    def ask_transaction_filters(self):
+        """Ask the admin for the filters of a transaction search; empty answers mean no filter."""
+        def ask(prompt, parse):
+            answer = input(Fore.LIGHTBLUE_EX + prompt).strip()
+            if not answer:
+                return None
+            try:
+                return parse(answer)
+            except ValueError:
+                print(Fore.LIGHTBLUE_EX + "Valeur invalide, filtre ignoré.")
+                return None
+
+        def day_start(text):
+            return time.mktime(time.strptime(text, "%d/%m/%Y"))
+
+        filters = {
+            "user_id": ask("ID de l'utilisateur (vide pour tous): ", str),
+            "start": ask("Date de début (JJ/MM/AAAA): ", day_start),
+            "end": ask("Date de fin (JJ/MM/AAAA): ", lambda text: day_start(text) + 86400 - 1e-3),
+            "min_amount": ask("Montant minimum: ", float),
+            "max_amount": ask("Montant maximum: ", float),
+            "description": ask("Description contenant: ", str),
+        }
+        return {key: value for key, value in filters.items() if value is not None}
+
+    def admin_transactions(self):
+        """Search the transactions of every user and show them or export them."""
+        filters = self.ask_transaction_filters()
+        print(Fore.LIGHTBLUE_EX + "1. Afficher")
+        print(Fore.LIGHTBLUE_EX + "2. Exporter en CSV")
+        print(Fore.LIGHTBLUE_EX + "3. Exporter en JSONL")
+        choice = input(Fore.LIGHTBLUE_EX + "Choisissez une option: ")
+        if choice == "1":
+            self.print_transactions(**filters)
+        elif choice in ("2", "3"):
+            path = "files/transactions.csv" if choice == "2" else "files/transactions.jsonl"
+            export = export_csv if choice == "2" else export_jsonl
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                count = export(self.query_transactions(**filters), file)
+            print(Fore.LIGHTBLUE_EX + f"{count} transactions exportées dans {path}.")
         else:
-            for transaction in self.current_user.transaction_history:
-                print(Fore.LIGHTBLUE_EX + f"{transaction['description']}: {transaction['amount']}")
+            print(Fore.LIGHTBLUE_EX + "Option invalide.")
+        print(Fore.LIGHTBLUE_EX + "Appuyez sur une touche pour continuer...")
+        msvcrt.getch()
 
+    def import_transfers(self):
+        """Apply a CSV or JSONL file of transfers and list the rejected rows."""
+        path = input(Fore.LIGHTBLUE_EX + "Chemin du fichier (.csv ou .jsonl): ").strip()
+        chunk = input(Fore.LIGHTBLUE_EX + "Enregistrer tous les N virements (vide pour une fois à la fin): ").strip()
+        if not os.path.exists(path):
+            print(Fore.LIGHTRED_EX + "Fichier introuvable.")
+        else:
+            report = batch.import_transfers(self, path, int(chunk) if chunk.isdigit() and int(chunk) > 0 else None)
+            print(Fore.LIGHTBLUE_EX + f"{report.applied} virements appliqués ({report.total:.2f} euros), "
+                                      f"{len(report.errors)} lignes rejetées.")
+            for line, message in report.errors[:TRANSACTIONS_PER_PAGE]:
+                print(Fore.LIGHTRED_EX + f"Ligne {line}: {message}")
+            if len(report.errors) > TRANSACTIONS_PER_PAGE:
+                print(Fore.LIGHTRED_EX + f"... et {len(report.errors) - TRANSACTIONS_PER_PAGE} autres.")
         print(Fore.LIGHTBLUE_EX + "Appuyez sur une touche pour continuer...")
-        msvcrt.getch()  # Wait for key press
+        msvcrt.getch()
 
     def user_dashboard(self):
         while True:
@@ -239,7 +437,8 @@ class Bank:
             print(Fore.LIGHTBLUE_EX + "6. Afficher le solde")
             print(Fore.LIGHTBLUE_EX + "7. Jouer aux Mines")
             print(Fore.LIGHTBLUE_EX + "8. Jouer aux Dés")
-            print(Fore.LIGHTBLUE_EX + "9. Quitter")
+            print(Fore.LIGHTBLUE_EX + "9. Pari automatique aux Dés")
+            print(Fore.LIGHTBLUE_EX + "10. Quitter")
             choice = input(Fore.LIGHTBLUE_EX + "Choisissez une option: ")
             self.clear_screen()
             if choice == "1":
@@ -256,23 +455,44 @@ class Bank:
                 self.show_balance()
             elif choice == "7":
                 from mines import run_mines
-                game = run_mines(self.current_user.balance / 93565)
+                start = self.current_user.balance
+                game = run_mines(start / 93565)
                 game.run()  # Explicitly start the game loop
-                self.current_user.balance = game.balance * 93565 # Update balance after the game
-                self.save_users()
+                self.settle_game(self.current_user, game.balance * 93565 - start, "Mines")
             elif choice == "8":
                 from dice import run_dice
-                game = run_dice(self.current_user.balance / 93565)
+                start = self.current_user.balance
+                game = run_dice(start / 93565)
                 game.run()  # Explicitly start the game loop
-                self.current_user.balance = game.balance *93565 # Update balance after the game
-                self.save_users()
+                self.settle_game(self.current_user, game.balance * 93565 - start, "Dés")
             elif choice == "9":
+                self.auto_bet()
+            elif choice == "10":
                 print(Fore.LIGHTBLUE_EX + "Déconnexion.")
                 self.current_user = None
                 break
             else:
                 print(Fore.LIGHTBLUE_EX + "Option invalide.")
 
+    def auto_bet(self):
+        """Play dice bets without a window until the strategy stops."""
+        print(Fore.LIGHTBLUE_EX + "Pari automatique aux Dés.")
+        print(Fore.LIGHTBLUE_EX + "1. Mise fixe")
+        print(Fore.LIGHTBLUE_EX + "2. Martingale")
+        choice = input(Fore.LIGHTBLUE_EX + "Choisissez une stratégie: ")
+        mise = float(input(Fore.LIGHTBLUE_EX + "Mise de base (euros): "))
+        nombre = int(input(Fore.LIGHTBLUE_EX + "Nombre de paris: "))
+        stop_loss = float(input(Fore.LIGHTBLUE_EX + "Arrêter si le solde descend à (euros): "))
+        take_profit = float(input(Fore.LIGHTBLUE_EX + "Arrêter si le solde atteint (euros): "))
+
+        strategy = Martingale(mise / 93565) if choice == "2" else FlatBet(mise / 93565)
+        start = self.current_user.balance
+        game = HeadlessDice(start / 93565, StopLimits(strategy, stop_loss / 93565, take_profit / 93565), nombre)
+        auto = game.run()
+        self.settle_game(self.current_user, game.balance * 93565 - start, "Dés (pari automatique)")
+        print(Fore.LIGHTBLUE_EX + f"{auto.bets} paris joués, {auto.wins} gagnés. Solde: {self.current_user.balance:.2f} euros.")
+        msvcrt.getch()
+
     def show_balance(self):
         print(Fore.LIGHTBLUE_EX + f"Votre solde actuel est de {self.current_user.balance} euros.")
         print(Fore.LIGHTBLUE_EX + f"Appuyez sur une touche pour continuer")
@@ -280,58 +500,15 @@ class Bank:
 
     def fetch_investment_data(self, ticker):
         """Simulate fetching investment data for assets with random closing prices."""
-        # Generate random data for 1 year (365 days)
-        num_days = 365
-        start_date = datetime.today() - timedelta(days=num_days)
-        dates = [start_date + timedelta(days=i) for i in range(num_days)]
-        closing_prices = [random.uniform(100, 500) for _ in range(num_days)]  # Simulated closing prices
-        return list(zip(dates, closing_prices))  # Return pairs of (date, price)
+        return market.fetch(ticker)  # PriceSeries cached per ticker and day
 
     def plot_investment(self, data, asset):
         """Plot the investment data with color-coding based on price change."""
-        # Prepare dates and prices for plotting
-        dates = [entry[0].strftime('%d/%m/%Y') for entry in data]
-        prices = [entry[1] for entry in data]
-
-        # Color coding logic
-        colors = []
-        for i in range(1, len(prices)):
-            if prices[i] > prices[i - 1]:  # Price is rising
-                colors.append("green")
-            else:  # Price is lowering
-                colors.append("red")
-
-        # Append the first color (no previous data to compare, choose green or red)
-        colors = ["green"] + colors
-
-        # Use plotext to plot the data with color coding
-        plt.clf()  # Clear previous plot if any
-
-        # Loop through the data points and plot each with the corresponding color
-        for i in range(len(prices) - 1):
-            plt.plot([dates[i], dates[i + 1]], [prices[i], prices[i + 1]], color=colors[i])
-
-        # Title and axis labels
-        plt.title(f"{asset} Closing Prices Over 1 Year")
-        plt.xlabel("Date")
-        plt.ylabel("Price ($)")
-
-        # Manually adjust xticks labels (plotext automatically handles the x-axis spacing)
-        plt.xticks(dates[::30])  # Show only a subset of dates to avoid clutter
-
-        plt.show()
+        charts.plot_price_series(data, f"{asset} Closing Prices Over 1 Year")
 
     def invest(self):
         """Investment menu for the user."""
-        assets = {
-            "Bitcoin": "BTC-USD",
-            "Ethereum": "ETH-USD",
-            "Apple": "AAPL",
-            "Tesla": "TSLA",
-            "Microsoft": "MSFT",
-            "Google": "GOOG",
-            "Alibaba": "BABA",
-        }
+        assets = market.ASSETS
 
         print("Options d'investissement:")
         for idx, asset in enumerate(assets, 1):
@@ -354,15 +531,11 @@ class Bank:
 
             # Amount to invest
             amount = float(input(f"Combien voulez-vous investir dans {asset}? "))
-            if self.current_user.balance >= amount:
-                # Simulate number of shares bought based on the first day's closing price
-                shares_bought = amount / data[0][1]  # Buy based on first day's closing price
-                self.current_user.wallet[asset] = self.current_user.wallet.get(asset, 0) + shares_bought
-                self.current_user.balance -= amount
-                self.current_user.log_transaction(f"Investi dans {asset}", -amount)
+            try:
+                self.buy_asset(self.current_user, asset, amount)
                 print(f"Vous avez investi {amount} dans {asset}.")
-            else:
-                print("Fonds insuffisants!")
+            except BankError as error:
+                print(error)
         else:
             print("Option invalide!")
 
@@ -381,21 +554,16 @@ class Bank:
             asset = list(self.current_user.wallet.keys())[int(choice) - 1]
             shares = self.current_user.wallet[asset]
 
-            price_per_share = self.fetch_investment_data(asset)[-1][1]  # Simulated current price
+            price_per_share = self.fetch_investment_data(market.ASSETS[asset]).last  # Simulated current price
             current_value = shares * price_per_share
 
             amount = float(
                 input(Fore.LIGHTBLUE_EX + f"Combien voulez-vous retirer de {asset}? (max {current_value}): "))
-            if 0 < amount <= current_value:
-                shares_to_sell = amount / price_per_share
-                self.current_user.wallet[asset] -= shares_to_sell
-                if self.current_user.wallet[asset] <= 0:
-                    del self.current_user.wallet[asset]  # Remove asset if fully withdrawn
-                self.current_user.balance += amount
-                self.current_user.log_transaction(f"Retiré de {asset}", amount)
+            try:
+                self.sell_asset(self.current_user, asset, amount)
                 print(Fore.LIGHTBLUE_EX + f"Vous avez retiré {amount} de {asset}.")
-            else:
-                print(Fore.LIGHTRED_EX + "Montant invalide!")
+            except BankError as error:
+                print(Fore.LIGHTRED_EX + str(error))
         else:
             print(Fore.LIGHTRED_EX + "Option invalide!")
         msvcrt.getch()
@@ -421,117 +589,217 @@ class Bank:
             msvcrt.getch()
             return
 
-        # Vérification des fonds disponibles
-        if sender.balance < amount:
-            print(Fore.RED + "Fonds insuffisants.")
+        # Réalisation du transfert
+        try:
+            self.transfer(sender, receiver, amount)
+        except BankError as error:
+            print(Fore.RED + str(error))
             print(Fore.LIGHTBLUE_EX + f"Appuyez sur une touche pour continuer")
             msvcrt.getch()
-
             return
 
-        # Réalisation du transfert
-        sender.balance -= amount
-        receiver.balance += amount
-
-        # Enregistrement des transactions
-        sender.log_transaction(f"Transfert à {receiver.name} {receiver.surname}", -amount)
-        receiver.log_transaction(f"Transfert de {sender.name} {sender.surname}", amount)
-
-        # Sauvegarde des données
-        self.save_users()
-
         # Confirmation du transfert
         print(Fore.GREEN + f"Transfert réussi! {amount} euros transférés de {sender.name} à {receiver.name}.")
         msvcrt.getch()
 
-    def find_user_by_name(self, name, surname):
-        for user in self.users:
-            if user.name == name and user.surname == surname:
-                return user
-        return None
+    # Operations without console I/O, shared by the menus and server.py.
+    # They raise BankError with the message to show when the bank refuses.
+
+    def buy_asset(self, user, asset, amount):
+        """Invest `amount` in `asset` at the first closing price of its series; return the shares bought."""
+        if asset not in market.ASSETS:
+            raise BankError("Option invalide!")
+        if not amount > 0:
+            raise BankError("Montant invalide!")
+        price_per_share = self.fetch_investment_data(market.ASSETS[asset]).first
+        with self.locked(user):
+            if user.balance < amount:
+                raise BankError("Fonds insuffisants!")
+            shares = amount / price_per_share
+            user.wallet[asset] = user.wallet.get(asset, 0) + shares
+            user.balance -= amount
+            user.log_transaction(f"Investi dans {asset}", -amount)
+            self.save_users(user)
+        return shares
+
+    def sell_asset(self, user, asset, amount):
+        """Withdraw `amount` from `asset` at the last closing price of its series; return the shares sold."""
+        if asset not in market.ASSETS:
+            raise BankError("Option invalide!")
+        price_per_share = self.fetch_investment_data(market.ASSETS[asset]).last  # Simulated current price
+        with self.locked(user):
+            if not 0 < amount <= user.wallet.get(asset, 0) * price_per_share:
+                raise BankError("Montant invalide!")
+            shares = amount / price_per_share
+            user.wallet[asset] -= shares
+            if user.wallet[asset] <= 0:
+                del user.wallet[asset]  # Remove asset if fully withdrawn
+            user.balance += amount
+            user.log_transaction(f"Retiré de {asset}", amount)
+            self.save_users(user)
+        return shares
+
+    def transfer(self, sender, receiver, amount):
+        if not amount > 0:
+            raise BankError("Montant invalide.")
+        with self.locked(sender, receiver):
+            if sender.balance < amount:
+                raise BankError("Fonds insuffisants.")
+            sender.balance -= amount
+            receiver.balance += amount
+            sender.log_transaction(f"Transfert à {receiver.name} {receiver.surname}", -amount)
+            receiver.log_transaction(f"Transfert de {sender.name} {sender.surname}", amount)
+            self.save_users(sender, receiver)
+
+    def check_loan(self, user, amount=None, months=None):
+        """Raise BankError if `user` cannot borrow; amount and months are checked once known."""
+        if user.age < 18:
+            raise BankError("Désolé, vous devez avoir au moins 18 ans pour demander un prêt.")
+        if user.trust < 50:
+            raise BankError("Votre score de confiance est trop bas pour demander un prêt.")
+        if amount is not None and not 0 < amount <= user.trust * 10:
+            raise BankError(f"Désolé, le montant maximum que vous pouvez emprunter est de {user.trust * 10}.")
+        if months is not None and not 1 <= months <= 12:
+            raise BankError("La période de remboursement doit être entre 1 et 12 mois.")
+
+    def grant_loan(self, user, amount, months):
+        """Lend `amount` repaid over `months` and schedule the repayments; return the monthly installment."""
+        with self.locked(user):
+            self.check_loan(user, amount, months)
+            mensualite = round(amount / months, 2)
+            user.loans["Prêt"] = amount
+            user.loans["mensualite"] = mensualite
+            user.balance += amount
+            user.log_transaction("Prêt reçu", amount)
+            self.save_users(user)
+        self.loan_scheduler.schedule(user.user_id)
+        return mensualite
+
+    def settle_game(self, user, net, game):
+        """Add the net result of a game to the balance, keeping the changes made while it was played."""
+        with self.locked(user):
+            user.balance += net
+            if net:
+                user.log_transaction(f"Résultat du jeu {game}", net)
+            self.save_users(user)
 
-    def start_loan_repayment_thread(self, user):
-        def repay_loan():
-            while True:
-                time.sleep(300)  # Simulate one month in 30 seconds for demonstration
-                with threading.Lock():  # Thread-safe access to user data
-                    if user.loans.get("Prêt", 0) <= 0:
-                        print(Fore.LIGHTBLUE_EX + "Le prêt est entièrement remboursé.")
-                        user.loans.pop("Prêt", None)
-                        self.loan_threads.pop(user.user_id, None)  # Remove thread reference
-                        break
-                    elif user.balance >= user.loans["mensualite"]:
-                        user.balance -= user.loans["mensualite"]
-                        user.loans["Prêt"] -= user.loans["mensualite"]
-                        user.log_transaction("Remboursement mensuel automatique", -user.loans["mensualite"])
-                        self.save_users()
-                        print(Fore.LIGHTBLUE_EX +
-                              f"Remboursement de {user.loans['mensualite']} effectué. Solde restant: {user.loans['Prêt']:.2f}")
+    def find_user_by_name(self, name, surname):
+        homonyms = self.users_named(name, surname)
+        return homonyms[0] if homonyms else None
+
+    def repay_loans(self, user_ids):
+        """Take the monthly installment of every loan due in one pass; return the ids still repaying."""
+        users = [user for user in map(self.get_user, user_ids) if user is not None]
+        if not users:
+            return set()
+        # Read without the locks: each result is only written back if the user
+        # has not changed since, and settled again on its own otherwise.
+        loans = list(map(attrgetter("loans"), users))
+        balances = np.fromiter(map(attrgetter("balance"), users), dtype=np.float64, count=len(users))
+        principal = np.fromiter(map(methodcaller("get", "Prêt", 0), loans), dtype=np.float64, count=len(users))
+        installments = np.fromiter(map(methodcaller("get", "mensualite", 0), loans), dtype=np.float64, count=len(users))
+        new_balances, new_principal, status = settle(balances, principal, installments)
+
+        changed = np.flatnonzero(status != INSUFFICIENT)
+        indices = changed.tolist()
+        kept = []
+        retry = []
+        # No other change is journaled until the pass is, so the pass holds
+        # the store lock and only tries the user locks, never waiting on them.
+        with self.store.lock:
+            for index, user, loan, balance, owed, outcome, new_balance, remaining in zip(
+                    indices, map(users.__getitem__, indices), map(loans.__getitem__, indices),
+                    balances[changed].tolist(), principal[changed].tolist(), status[changed].tolist(),
+                    new_balances[changed].tolist(), new_principal[changed].tolist()):
+                lock = user._lock
+                if not lock.acquire(blocking=False):
+                    retry.append(user)
+                    continue
+                if user.balance == balance and user.loans is loan and loan.get("Prêt", 0) == owed:
+                    if outcome == PAID_OFF:
+                        loan.pop("Prêt", None)
                     else:
-                        print(Fore.LIGHTBLUE_EX +
-                              "Fonds insuffisants pour effectuer le remboursement mensuel. Dépôt nécessaire.")
-                        break
-
-        # Start the repayment thread if not already running
-        if user.user_id not in self.loan_threads:
-            loan_thread = threading.Thread(target=repay_loan, daemon=True)
-            self.loan_threads[user.user_id] = loan_thread
-            loan_thread.start()
+                        user.balance = new_balance
+                        loan["Prêt"] = remaining
+                    kept.append(index)
+                else:  # Changed since it was read
+                    retry.append(user)
+                lock.release()
+
+            kept = np.array(kept, dtype=np.intp)
+            charged = np.flatnonzero(status[kept] == REPAID)
+            settled = [users[index] for index in kept.tolist()]
+            charged_ids = [settled[index].user_id for index in charged.tolist()]
+            amounts = (-installments[kept[charged]]).tolist()
+            when = time.time()
+            rows = self.ledger.append_column(charged_ids, "Remboursement mensuel automatique", amounts, when)
+            self.store.settle(settled, new_balances[kept].tolist(),
+                              np.where(status[kept] == PAID_OFF, np.nan, new_principal[kept]).tolist(),
+                              charged.tolist(), amounts, rows, "Remboursement mensuel automatique", when)
+        if self.store.should_compact():
+            self.store.snapshot(list(self.users.values()))
+
+        active = set(charged_ids)
+        for user in retry:
+            if self.repay_loan(user) == REPAID:
+                active.add(user.user_id)
+        if self.current_user in users:
+            index = users.index(self.current_user)
+            if status[index] == PAID_OFF:
+                print(Fore.LIGHTBLUE_EX + "Le prêt est entièrement remboursé.")
+            elif status[index] == REPAID:
+                print(Fore.LIGHTBLUE_EX + f"Remboursement de {installments[index]} effectué. "
+                                          f"Solde restant: {new_principal[index]:.2f}")
+            else:
+                print(Fore.LIGHTBLUE_EX + "Fonds insuffisants pour effectuer le remboursement mensuel. Dépôt nécessaire.")
+        return active
+
+    def repay_loan(self, user):
+        """Take the monthly installment of one loan under the user's lock and return its outcome."""
+        with self.locked(user):
+            (balance,), (remaining,), (outcome,) = settle(
+                np.array([user.balance], dtype=np.float64),
+                np.array([user.loans.get("Prêt", 0)], dtype=np.float64),
+                np.array([user.loans.get("mensualite", 0)], dtype=np.float64))
+            if outcome == PAID_OFF:
+                user.loans.pop("Prêt", None)
+            elif outcome == REPAID:
+                user.balance = float(balance)
+                user.loans["Prêt"] = float(remaining)
+                user.log_transaction("Remboursement mensuel automatique", -user.loans["mensualite"])
+            if outcome != INSUFFICIENT:
+                self.save_users(user)
+        return outcome
 
     def take_loan(self):
         print(Fore.LIGHTBLUE_EX + "Entretien pour un prêt bancaire.")
         # Entretien d'éligibilité
         print(Fore.LIGHTBLUE_EX + "Veuillez répondre à quelques questions pour déterminer votre éligibilité.")
-        age = self.current_user.age
-        if age < 18:
-            print(Fore.LIGHTBLUE_EX + "Désolé, vous devez avoir au moins 18 ans pour demander un prêt.")
-            print(Fore.LIGHTBLUE_EX + f"Appuyez sur une touche pour continuer")
-            msvcrt.getch()
-            return
-
-        revenu_stable = input(Fore.LIGHTBLUE_EX + "Avez-vous une source de revenus stable? (oui/non): ").lower()
-        if revenu_stable != "oui":
-            print(Fore.LIGHTBLUE_EX + "Désolé, nous ne pouvons pas approuver un prêt sans une source de revenus stable.")
-            print(Fore.LIGHTBLUE_EX + f"Appuyez sur une touche pour continuer")
-            msvcrt.getch()
-            return
-
-        print(Fore.LIGHTBLUE_EX + "Vérification de votre score de confiance...")
-        time.sleep(1)
-        if self.current_user.trust < 50:
-            print(Fore.LIGHTBLUE_EX + "Votre score de confiance est trop bas pour demander un prêt.")
-            return
-
-        # Détails du prêt
-        print(Fore.LIGHTBLUE_EX + "Félicitations, vous êtes éligible pour un prêt!")
-        montant_pret = float(input(Fore.LIGHTBLUE_EX + "Entrez le montant du prêt souhaité: "))
-        montant_max = self.current_user.trust * 10
-        if montant_pret > montant_max:
-            print(Fore.LIGHTBLUE_EX + f"Désolé, le montant maximum que vous pouvez emprunter est de {montant_max}.")
-            print(Fore.LIGHTBLUE_EX + f"Appuyez sur une touche pour continuer")
-            msvcrt.getch()
-            return
-
-        periode_remboursement = int(input(Fore.LIGHTBLUE_EX + "En combien de mois souhaitez-vous rembourser le prêt? (max 12): "))
-        if periode_remboursement > 12 or periode_remboursement <= 0:
-            print(Fore.LIGHTBLUE_EX + "La période de remboursement doit être entre 1 et 12 mois.")
+        try:
+            self.check_loan(self.current_user)
+            revenu_stable = input(Fore.LIGHTBLUE_EX + "Avez-vous une source de revenus stable? (oui/non): ").lower()
+            if revenu_stable != "oui":
+                raise BankError("Désolé, nous ne pouvons pas approuver un prêt sans une source de revenus stable.")
+
+            print(Fore.LIGHTBLUE_EX + "Vérification de votre score de confiance...")
+            time.sleep(1)
+
+            # Détails du prêt
+            print(Fore.LIGHTBLUE_EX + "Félicitations, vous êtes éligible pour un prêt!")
+            montant_pret = float(input(Fore.LIGHTBLUE_EX + "Entrez le montant du prêt souhaité: "))
+            self.check_loan(self.current_user, montant_pret)
+            periode_remboursement = int(input(Fore.LIGHTBLUE_EX + "En combien de mois souhaitez-vous rembourser le prêt? (max 12): "))
+
+            # Approbation du prêt, the repayments start right away
+            mensualite = self.grant_loan(self.current_user, montant_pret, periode_remboursement)
+        except BankError as error:
+            print(Fore.LIGHTBLUE_EX + str(error))
             print(Fore.LIGHTBLUE_EX + f"Appuyez sur une touche pour continuer")
             msvcrt.getch()
             return
 
-        mensualite = round(montant_pret / periode_remboursement, 2)
         print(Fore.LIGHTBLUE_EX + f"Votre paiement mensuel sera de {mensualite} pour {periode_remboursement} mois.")
-
-        # Approbation du prêt
-        self.current_user.loans["Prêt"] = montant_pret
-        self.current_user.loans["mensualite"] = mensualite
-        self.current_user.balance += montant_pret
-        self.current_user.log_transaction("Prêt reçu", montant_pret)
         print(Fore.LIGHTBLUE_EX + f"Prêt approuvé! {montant_pret} ont été ajoutés à votre compte.")
-        self.save_users()
-
-        # Start the repayment process
-        self.start_loan_repayment_thread(self.current_user)
         msvcrt.getch()
 
 
@@ -539,6 +807,8 @@ class Bank:
 
 
 
+if __name__ == "__main__":
+    init(autoreset=True)  # Ensures color reset after each output
+    bank = Bank(store=SqliteStore() if "--sqlite" in sys.argv else None)
+    bank.main_menu()
 
-bank = Bank()
-bank.main_menu()
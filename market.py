@@ -0,0 +1,81 @@
+import functools
+import hashlib
+from datetime import date
+
+import numpy as np
+
+
+ASSETS = {
+    "Bitcoin": "BTC-USD",
+    "Ethereum": "ETH-USD",
+    "Apple": "AAPL",
+    "Tesla": "TSLA",
+    "Microsoft": "MSFT",
+    "Google": "GOOG",
+    "Alibaba": "BABA",
+}
+
+NUM_DAYS = 365
+
+
+class PriceSeries:
+    """Daily closing prices stored column-wise: a datetime64[D] array and a float64 array."""
+
+    def __init__(self, dates, close):
+        self.dates = dates
+        self.close = close
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return PriceSeries(self.dates[key], self.close[key])
+        return self.dates[key], self.close[key]
+
+    @property
+    def first(self):
+        return float(self.close[0])
+
+    @property
+    def last(self):
+        return float(self.close[-1])
+
+    @property
+    def up(self):
+        """True for each day-to-day move where the price rose."""
+        return self.close[1:] > self.close[:-1]
+
+    @property
+    def down(self):
+        return ~self.up
+
+    @property
+    def returns(self):
+        return np.diff(self.close) / self.close[:-1]
+
+    def between(self, start, end):
+        """Sub-series for the dates in [start, end]."""
+        lo = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return self[lo:hi]
+
+
+def seed(ticker, day):
+    return int.from_bytes(hashlib.blake2b(f"{ticker}:{day}".encode(), digest_size=8).digest(), "little")
+
+
+@functools.lru_cache(maxsize=128)
+def price_series(ticker, day, num_days=NUM_DAYS):
+    """Simulated closing prices over the days before `day`, identical for every call with the same arguments."""
+    end = np.datetime64(day, "D")
+    dates = np.arange(end - num_days, end, dtype="datetime64[D]")
+    close = np.random.default_rng(seed(ticker, day)).uniform(100, 500, num_days)
+    dates.flags.writeable = False  # Shared by every caller through the cache
+    close.flags.writeable = False
+    return PriceSeries(dates, close)
+
+
+def fetch(ticker):
+    """Today's price series for `ticker`; see price_series.cache_info() for hits and misses."""
+    return price_series(ticker, date.today())
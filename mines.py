@@ -1,16 +1,15 @@
 import pygame
 import random
 import sys
+import ui
+import assets
+from autobet import AutoBet, default_strategy
+from mines_engine import COLS, MIN_BET, ROWS, MinesEngine
 
-# Initialize Pygame
-
-pygame.init()
 # Screen dimensions
 WIDTH, HEIGHT = 1100, 700
 GRID_WIDTH = 700
 GRID_HEIGHT = 700
-ROWS, COLS = 5, 5  # Grid dimensions
-CELL_SIZE = GRID_WIDTH // COLS
 
 # Colors
 BG_COLOR = (24, 26, 27)
@@ -23,30 +22,15 @@ BUTTON_COLOR = (32, 178, 70)    # Green buttons
 DISABLED_BUTTON_COLOR = (64, 64, 64)
 TEXT_COLOR = (255, 255, 255)
 
-# Fonts
-font = pygame.font.Font(None, 36)
-small_font = pygame.font.Font(None, 28)
-
-# Sounds
-bet_sound = pygame.mixer.Sound("audios/bet.mp3")
-click_sound = pygame.mixer.Sound("audios/click.mp3")
-diamond_sound = pygame.mixer.Sound("audios/diamond.mp3")
-mine_sound = pygame.mixer.Sound("audios/mine.mp3")
-cashout_sound = pygame.mixer.Sound("audios/cashout.mp3")
-hover_sound = pygame.mixer.Sound("audios/hover.mp3")
-
-# Set volume for sounds
-bet_sound.set_volume(0.5)
-click_sound.set_volume(0.5)
-diamond_sound.set_volume(0.5)
-mine_sound.set_volume(0.5)
-cashout_sound.set_volume(0.5)
-hover_sound.set_volume(0.5)
-
-# Game settings
-DEFAULT_MINE_COUNT = 6
-DEFAULT_BET = 0  # Default bet amount in BTC
-MAX_MINES = ROWS * COLS - 1
+# Fonts and sounds, created by load_assets() on first use
+font = small_font = None
+bet_sound = click_sound = diamond_sound = mine_sound = cashout_sound = hover_sound = None
+
+# Frame rate cap while something is moving
+MAX_FPS = 30
+
+# Auto-bet: cells revealed before cashing out
+AUTO_REVEALS = 3
 
 # Conversion rates
 conversion_rates = {
@@ -56,9 +40,26 @@ conversion_rates = {
     "EUR": 93565,
 }
 
-# Initialize screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Stake Mines Game")
+def load_assets():
+    """Initialize pygame and load the fonts and sounds the first time a game is created."""
+    global font, small_font, bet_sound, click_sound, diamond_sound, mine_sound, cashout_sound, hover_sound
+    if font is not None:
+        return
+
+    # Initialize Pygame
+    pygame.init()
+
+    # Fonts
+    font = pygame.font.Font(None, 36)
+    small_font = pygame.font.Font(None, 28)
+
+    # Sounds, shared with the other games
+    bet_sound = assets.load_sound("audios/bet.mp3")
+    click_sound = assets.load_sound("audios/click.mp3")
+    diamond_sound = assets.load_sound("audios/diamond.mp3")
+    mine_sound = assets.load_sound("audios/mine.mp3")
+    cashout_sound = assets.load_sound("audios/cashout.mp3")
+    hover_sound = assets.load_sound("audios/hover.mp3")
 
 class Button:
     def __init__(self, x, y, width, height, text, action=None, enabled=True):
@@ -71,7 +72,7 @@ class Button:
     def draw(self, screen):
         color = HIGHLIGHT_COLOR if self.hovered else BUTTON_COLOR if self.enabled else DISABLED_BUTTON_COLOR
         pygame.draw.rect(screen, color, self.rect, border_radius=8)
-        text_surface = small_font.render(self.text, True, TEXT_COLOR)
+        text_surface = ui.render_label(small_font, self.text, TEXT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -82,31 +83,6 @@ class Button:
         if self.enabled and self.is_hovered(pos) and self.action:
             self.action()
 
-class Cell:
-    def __init__(self, row, col):
-        self.row = row
-        self.col = col
-        self.is_mine = False
-        self.is_revealed = False
-        self.rect = pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-
-    def draw(self, screen):
-        pygame.draw.rect(screen, GRID_BORDER_COLOR, self.rect, 1)
-        if self.is_revealed:
-            color = MINE_COLOR if self.is_mine else DIAMOND_COLOR
-            shape = 'circle' if self.is_mine else 'polygon'
-            if shape == 'circle':
-                pygame.draw.circle(screen, color, self.rect.center, CELL_SIZE // 4)
-            else:
-                pygame.draw.polygon(screen, color, self._diamond_points())
-        else:
-            pygame.draw.rect(screen, HIDDEN_COLOR, self.rect)
-
-    def _diamond_points(self):
-        cx, cy = self.rect.center
-        size = CELL_SIZE // 4
-        return [(cx, cy - size), (cx + size, cy), (cx, cy + size), (cx - size, cy)]
-
 class Dropdown:
     def __init__(self, x, y, width, height, options, selected_index=0, action=None):
         self.rect = pygame.Rect(x, y, width, height)
@@ -118,7 +94,7 @@ class Dropdown:
     def draw(self, screen):
         pygame.draw.rect(screen, BUTTON_COLOR, self.rect, border_radius=8)
         selected_option = self.options[self.selected_index]
-        text_surface = small_font.render(selected_option, True, TEXT_COLOR)
+        text_surface = ui.render_label(small_font, selected_option, TEXT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -126,7 +102,7 @@ class Dropdown:
             for i, option in enumerate(self.options):
                 option_rect = pygame.Rect(self.rect.x, self.rect.y + (i + 1) * self.rect.height, self.rect.width, self.rect.height)
                 pygame.draw.rect(screen, BUTTON_COLOR, option_rect, border_radius=8)
-                option_text = small_font.render(option, True, TEXT_COLOR)
+                option_text = ui.render_label(small_font, option, TEXT_COLOR)
                 option_text_rect = option_text.get_rect(center=option_rect.center)
                 screen.blit(option_text, option_text_rect)
 
@@ -144,15 +120,16 @@ class Dropdown:
             self.expanded = not self.expanded
 
 class MinesGame:
-    def __init__(self, balance):
-        self.grid = [[Cell(row, col) for col in range(COLS)] for row in range(ROWS)]
-        self.mine_count = DEFAULT_MINE_COUNT
-        self.place_mines()
-        self.running = True
-        self.revealed_cells = 0
-        self.bet_amount = DEFAULT_BET
-        self.current_reward = 0
-        self.balance = balance
+    def __init__(self, balance, rows=ROWS, cols=COLS):
+        load_assets()
+        self.engine = MinesEngine(balance, rows, cols)
+        self.cell_size = min(GRID_WIDTH // cols, GRID_HEIGHT // rows)
+        self.auto = None
+        self.auto_round_bet = None  # Stake of the round being auto-played
+        self.dirty_cells = set()  # (row, col) of the cells to redraw
+        self.grid_dirty = True  # Redraw every cell
+        self.panel_state = None  # What the side panel showed when it was last drawn
+        self.full_redraw = True
         self.currency = "EUR"  # Default currency
         # Centered dropdown menu and smaller buttons
         button_width, button_height = 150, 40
@@ -166,41 +143,56 @@ class MinesGame:
             "decrease_mines": Button(button_x, 480, button_width, button_height, "- Mines", lambda: self.change_mines(-1)),
             "increase_bet": Button(button_x, 540, button_width, button_height, "+ Bet", lambda: self.change_bet(0.0001)),
             "decrease_bet": Button(button_x, 600, button_width, button_height, "- Bet", lambda: self.change_bet(-0.0001)),
+            "auto": Button(button_x, 660, button_width, button_height, "Auto", self.toggle_auto),
         }
 
-    def place_mines(self):
-        mine_positions = random.sample(range(ROWS * COLS), self.mine_count)
-        for pos in mine_positions:
-            row, col = divmod(pos, COLS)
-            self.grid[row][col].is_mine = True
+    @property
+    def balance(self):
+        return self.engine.balance
 
     def reset(self):
-        self.grid = [[Cell(row, col) for col in range(COLS)] for row in range(ROWS)]
-        self.place_mines()
-        self.revealed_cells = 0
-        self.running = True
-        self.current_reward = 0
+        self.engine.reset()
+        self.mark_grid_dirty()
+
+    def mark_grid_dirty(self):
+        self.grid_dirty = True
+        self.dirty_cells.clear()
+
+    def cell_rect(self, row, col):
+        return pygame.Rect(col * self.cell_size, row * self.cell_size, self.cell_size, self.cell_size)
+
+    def cell_at(self, pos):
+        """(row, col) of the cell under `pos`, or None outside the board."""
+        row, col = pos[1] // self.cell_size, pos[0] // self.cell_size
+        if pos[0] < GRID_WIDTH and row < self.engine.rows and col < self.engine.cols:
+            return row, col
+        return None
+
+    def draw_cell(self, screen, row, col):
+        rect = self.cell_rect(row, col)
+        pygame.draw.rect(screen, GRID_BORDER_COLOR, rect, 1)
+        if self.engine.is_revealed(row, col):
+            size = self.cell_size // 4
+            if self.engine.is_mine(row, col):
+                pygame.draw.circle(screen, MINE_COLOR, rect.center, size)
+            else:
+                cx, cy = rect.center
+                pygame.draw.polygon(screen, DIAMOND_COLOR, [(cx, cy - size), (cx + size, cy), (cx, cy + size), (cx - size, cy)])
+        else:
+            pygame.draw.rect(screen, HIDDEN_COLOR, rect)
+        return rect
 
     def reveal_cell(self, row, col):
-        if not self.running:
-            return
-
-        cell = self.grid[row][col]
-        if cell.is_revealed:
+        found_diamond = self.engine.reveal(row, col)
+        if found_diamond is None:
             return
+        self.dirty_cells.add((row, col))
 
         click_sound.play()
-        cell.is_revealed = True
-        if cell.is_mine:
-            mine_sound.play()
-            self.balance -= self.bet_amount
-            self.running = False
-        else:
+        if found_diamond:
             diamond_sound.play()
-            self.revealed_cells += 1
-            # Apply conservative multiplier
-            mine_multiplier = 1 + (self.mine_count / (MAX_MINES))
-            self.current_reward = round(self.bet_amount * (1.01 + (mine_multiplier))  ** (self.revealed_cells / 5), 8)
+        else:
+            mine_sound.play()
 
         if self.balance <= 0:
             print("Balance is zero. Game over!")
@@ -208,17 +200,54 @@ class MinesGame:
 
 
     def draw(self, screen):
-        screen.fill(BG_COLOR)
-        for row in self.grid:
-            for cell in row:
-                cell.draw(screen)
-        self.draw_interface(screen)
-
-    def draw_interface(self, screen):
+        """Redraw what changed since the last frame; return the rects to push to the display."""
+        dirty = []
+        if self.full_redraw:
+            screen.fill(BG_COLOR)
+            self.mark_grid_dirty()
+            self.panel_state = None
+            self.full_redraw = False
+            dirty.append(screen.get_rect())
+
+        if self.grid_dirty:
+            grid_rect = pygame.Rect(0, 0, self.engine.cols * self.cell_size, self.engine.rows * self.cell_size)
+            screen.fill(BG_COLOR, grid_rect)
+            for row in range(self.engine.rows):
+                for col in range(self.engine.cols):
+                    self.draw_cell(screen, row, col)
+            dirty.append(grid_rect)
+            self.grid_dirty = False
+        for row, col in self.dirty_cells:
+            rect = self.cell_rect(row, col)
+            screen.fill(BG_COLOR, rect)
+            dirty.append(self.draw_cell(screen, row, col))
+        self.dirty_cells.clear()
+
+        texts = self.panel_texts()
+        state = (texts, tuple((button.hovered, button.enabled) for button in self.buttons.values()),
+                 self.dropdown.expanded, self.dropdown.selected_index)
+        if state != self.panel_state:
+            dirty.append(self.draw_interface(screen, texts))
+            self.panel_state = state
+        return dirty
+
+    def panel_texts(self):
+        engine = self.engine
+        balance_text = f"Balance: {self.convert_currency(engine.balance):.2f} {self.currency}"
+        bet_text = f"Bet Amount: {self.convert_currency(engine.bet_amount):.2f} {self.currency}"
+        reward_text = f"Reward: {self.convert_currency(engine.current_reward):.2f} {self.currency}"
+        status_text = f"Revealed: {engine.revealed_cells} | Mines: {engine.mine_count}"
+        multiplier_text = f"Current Multiplier: {engine.multiplier:.3f}"
+        texts = [balance_text, bet_text, reward_text, status_text, multiplier_text]
+        if self.auto:
+            texts.append(self.auto.status())
+        return tuple(texts)
+
+    def draw_interface(self, screen, texts):
         panel_x = GRID_WIDTH + 20
         panel_width = WIDTH - GRID_WIDTH - 40
 
-        pygame.draw.rect(screen, HIDDEN_COLOR, (panel_x, 0, panel_width, HEIGHT))
+        panel_rect = pygame.draw.rect(screen, HIDDEN_COLOR, (panel_x, 0, panel_width, HEIGHT))
 
         # Define consistent padding and spacing
         padding = 20
@@ -226,15 +255,9 @@ class MinesGame:
         button_spacing = 10  # Space between buttons
 
         # Draw text elements
-        balance_text = f"Balance: {self.convert_currency(self.balance):.2f} {self.currency}"
-        bet_text = f"Bet Amount: {self.convert_currency(self.bet_amount):.2f} {self.currency}"
-        reward_text = f"Reward: {self.convert_currency(self.current_reward):.2f} {self.currency}"
-        status_text = f"Revealed: {self.revealed_cells} | Mines: {self.mine_count}"
-        multiplier_text = f"Current Multiplier: {1.01 + (self.mine_count / (2 * MAX_MINES)):.3f}"
-
         y_offset = padding
-        for text in [balance_text, bet_text, reward_text, status_text, multiplier_text]:
-            text_surface = font.render(text, True, TEXT_COLOR)
+        for text in texts:
+            text_surface = ui.render_text(font, text, TEXT_COLOR)
             screen.blit(text_surface, (panel_x + padding, y_offset))
             y_offset += line_height
 
@@ -249,24 +272,58 @@ class MinesGame:
             button.rect.x = panel_x + padding
             button.draw(screen)
             y_offset += button.rect.height + button_spacing
+        return panel_rect
 
     def cashout(self):
-        self.balance += self.current_reward
+        won = self.engine.cashout()
+        self.mark_grid_dirty()
         cashout_sound.play()
-        print(f"Cashed out: {self.current_reward:.8f} {self.currency}")
-        self.reset()
+        print(f"Cashed out: {won:.8f} {self.currency}")
+        return won
+
+    def toggle_auto(self):
+        """Start auto-betting with the current bet amount, raised to the minimum stake, or stop it."""
+        if self.auto and self.auto.running:
+            self.auto.running = False
+        else:
+            if MIN_BET > self.balance:
+                print("Cannot bet more than your current balance!")
+                return
+            self.reset()
+            self.engine.bet_amount = max(MIN_BET, self.engine.bet_amount)
+            self.auto = AutoBet(default_strategy(self.engine.bet_amount, self.balance))
+            self.auto_round_bet = None
+
+    def step_auto(self):
+        """Play one move of the auto-bet round: place the bet, reveal a cell or settle the round."""
+        if not (self.auto and self.auto.running):
+            return
+        engine = self.engine
+        if self.auto_round_bet is None:
+            amount = self.auto.next_bet(self.balance)
+            if amount is not None:
+                engine.bet_amount = amount
+                self.auto_round_bet = amount
+        elif not engine.running:
+            self.auto.record(-self.auto_round_bet)
+            self.auto_round_bet = None
+            self.reset()
+        elif engine.revealed_cells >= min(AUTO_REVEALS, engine.rows * engine.cols - engine.mine_count):
+            self.auto.record(self.cashout())
+            self.auto_round_bet = None
+        else:
+            self.reveal_cell(*random.choice(list(engine.hidden_cells())))
 
     def change_mines(self, delta):
-        new_mine_count = max(1, min(MAX_MINES, self.mine_count + delta))
-        self.mine_count = new_mine_count
-        self.reset()
+        self.engine.change_mines(delta)
+        self.mark_grid_dirty()
 
     def change_bet(self, amount):
-        new_bet = max(0.001, self.bet_amount + amount)
-        if new_bet > self.balance:
-            print("Cannot bet more than your current balance!")
-        else:
-            self.bet_amount = new_bet
+        if not self.engine.change_bet(amount):
+            if self.engine.running and self.engine.revealed:
+                print("Cannot change the bet during a round!")
+            else:
+                print("Cannot bet more than your current balance!")
 
 
     def change_currency(self, currency):
@@ -275,25 +332,27 @@ class MinesGame:
     def convert_currency(self, amount):
         return amount * conversion_rates[self.currency]
 
-    def run(self):
+    def run(self, max_fps=MAX_FPS):
 
         screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Stake Mines Game")
         clock = pygame.time.Clock()
         holding = False
+        self.full_redraw = True
 
+        events = []
         running = True
         while running:
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     pos = event.pos
                     if pos[0] < GRID_WIDTH:  # Click inside grid
-                        col, row = pos[0] // CELL_SIZE, pos[1] // CELL_SIZE
                         holding = True
-                        if row < ROWS and col < COLS:
-                            self.reveal_cell(row, col)
+                        cell = self.cell_at(pos)
+                        if cell:
+                            self.reveal_cell(*cell)
                     else:  # Click on buttons or dropdown menu
                         for button in self.buttons.values():
                             button.handle_click(pos)
@@ -303,11 +362,9 @@ class MinesGame:
                     holding = False
 
             if holding:
-                mouse_pos = pygame.mouse.get_pos()
-                if mouse_pos[0] < GRID_WIDTH:
-                    col, row = mouse_pos[0] // CELL_SIZE, mouse_pos[1] // CELL_SIZE
-                    if row < ROWS and col < COLS:
-                        self.reveal_cell(row, col)
+                cell = self.cell_at(pygame.mouse.get_pos())
+                if cell:
+                    self.reveal_cell(*cell)
 
             # Update button hover state
             for button in self.buttons.values():
@@ -315,17 +372,20 @@ class MinesGame:
                     hover_sound.play()
                 button.hovered = button.is_hovered(pygame.mouse.get_pos())
 
-            # Update cashout button state
-            self.buttons["cashout"].enabled = self.current_reward > 0 and self.running
+            self.step_auto()
 
-            # Draw everything
-            self.draw(screen)
+            # Update cashout button state
+            self.buttons["cashout"].enabled = self.engine.can_cashout()
 
-            pygame.display.flip()
-            clock.tick(30)
+            # Draw and push only what changed
+            dirty = self.draw(screen)
+            if dirty:
+                pygame.display.update(dirty)
+            # Only a drag across the grid or auto-betting changes the screen without new events
+            events = ui.next_events(clock, holding or bool(self.auto and self.auto.running), max_fps)
 
-        pygame.quit()
+        pygame.display.quit()  # Keep pygame, fonts and shared sounds alive for the next game
 
-def run_mines(balance):
+def run_mines(balance, rows=ROWS, cols=COLS):
     """Create and return a MinesGame instance."""
-    return MinesGame(balance)
+    return MinesGame(balance, rows, cols)
@@ -0,0 +1,170 @@
+import csv
+import functools
+import random
+import sys
+
+import numpy as np
+
+
+ROWS, COLS = 5, 5  # Default board size
+MAX_SIDE = 64
+DEFAULT_MINE_COUNT = 6
+DEFAULT_BET = 0  # Default bet amount in BTC
+MIN_BET = 0.001  # Smallest stake once a bet is set
+MAX_MINES = ROWS * COLS - 1
+HOUSE_EDGE = 0.01  # Share of the fair multiplier kept by the house
+
+
+@functools.lru_cache(maxsize=256)
+def fair_multipliers(mine_count, cells=ROWS * COLS):
+    """Inverse of the chance that k cells are all diamonds, C(n, k) / C(n - m, k), for k = 0 to every safe cell."""
+    safe = cells - mine_count
+    revealed = np.arange(1, safe + 1)
+    # Running product of (n - k + 1) / (n - m - k + 1): O(n) floats, overflowing to inf on huge boards
+    with np.errstate(over="ignore"):
+        table = np.concatenate(([1.0], np.cumprod((cells - revealed + 1) / (safe - revealed + 1))))
+    table.flags.writeable = False  # Shared by every caller through the cache
+    return table
+
+
+@functools.lru_cache(maxsize=256)
+def multipliers(mine_count, cells=ROWS * COLS, edge=HOUSE_EDGE):
+    """Multiplier paid after 0, 1, ... every safe cell revealed, indexed by the number of diamonds."""
+    table = fair_multipliers(mine_count, cells) * (1 - edge)
+    table.flags.writeable = False
+    return table
+
+
+def reward(bet, mine_count, revealed, cells=ROWS * COLS, edge=HOUSE_EDGE):
+    """Amount paid back, stake included, on cashout after `revealed` diamonds."""
+    return round(bet * float(multipliers(mine_count, cells, edge)[revealed]), 8)
+
+
+def write_payout_table(file, cells=ROWS * COLS, edge=HOUSE_EDGE):
+    """Write every (mine count, diamonds) pair as CSV, with its win probability, multipliers and return-to-player."""
+    writer = csv.writer(file)
+    writer.writerow(["mines", "revealed", "win_probability", "fair_multiplier", "multiplier", "rtp"])
+    for mine_count in range(1, cells):
+        fair_table = fair_multipliers(mine_count, cells).tolist()
+        for revealed, multiplier in enumerate(multipliers(mine_count, cells, edge).tolist()[1:], 1):
+            fair = fair_table[revealed]
+            writer.writerow([mine_count, revealed, f"{1 / fair:.12g}", f"{fair:.12g}", f"{multiplier:.12g}",
+                             f"{multiplier / fair:.6f}"])
+
+
+class MinesEngine:
+    """Board state held in two bitmasks: bit row * cols + col is set for each mine and each revealed cell."""
+
+    def __init__(self, balance, rows=ROWS, cols=COLS, mine_count=DEFAULT_MINE_COUNT):
+        if not (1 <= rows <= MAX_SIDE and 1 <= cols <= MAX_SIDE and rows * cols >= 2):
+            raise ValueError(f"Board size must be between 1x2 and {MAX_SIDE}x{MAX_SIDE}")
+        self.rows = rows
+        self.cols = cols
+        self.mine_count = max(1, min(rows * cols - 1, mine_count))
+        self.bet_amount = DEFAULT_BET
+        self.balance = balance
+        self.reset()
+
+    @property
+    def max_mines(self):
+        return self.rows * self.cols - 1
+
+    def place_mines(self):
+        mines = 0
+        for pos in random.sample(range(self.rows * self.cols), self.mine_count):
+            mines |= 1 << pos
+        self.mines = mines
+
+    def reset(self):
+        self.revealed = 0
+        self.place_mines()
+        self.revealed_cells = 0
+        self.running = True
+        self.current_reward = 0
+        self.round_bet = 0  # Stake of the round, fixed by its first reveal
+
+    def is_mine(self, row, col):
+        return self.mines >> (row * self.cols + col) & 1 == 1
+
+    def is_revealed(self, row, col):
+        return self.revealed >> (row * self.cols + col) & 1 == 1
+
+    def hidden_cells(self):
+        """(row, col) of every cell not revealed yet."""
+        hidden = ~self.revealed & ((1 << self.rows * self.cols) - 1)
+        while hidden:
+            low = hidden & -hidden
+            yield divmod(low.bit_length() - 1, self.cols)
+            hidden ^= low
+
+    def reveal(self, row, col):
+        """Reveal a cell; return True for a diamond, False for a mine and None if nothing happened."""
+        bit = 1 << (row * self.cols + col)
+        if not self.running or self.revealed & bit:
+            return None
+
+        if not self.revealed:
+            self.round_bet = self.bet_amount
+        self.revealed |= bit
+        if self.mines & bit:
+            self.balance -= self.round_bet
+            self.running = False
+            return False
+        self.revealed_cells += 1
+        self.current_reward = reward(self.round_bet, self.mine_count, self.revealed_cells, self.rows * self.cols)
+        return True
+
+    @property
+    def multiplier(self):
+        """Multiplier that cashing out now would pay."""
+        return float(multipliers(self.mine_count, self.rows * self.cols)[self.revealed_cells])
+
+    def can_cashout(self):
+        return self.current_reward > 0 and self.running
+
+    def cashout(self):
+        """Credit the payout minus the stake, which is only taken from the balance when a mine is hit."""
+        won = self.current_reward - self.round_bet
+        self.balance += won
+        self.reset()
+        return won
+
+    def change_mines(self, delta):
+        self.mine_count = max(1, min(self.max_mines, self.mine_count + delta))
+        self.reset()
+
+    def change_bet(self, amount):
+        """Change the bet; return False during a round or if it would exceed the balance."""
+        if self.running and self.revealed:
+            return False
+        new_bet = max(MIN_BET, self.bet_amount + amount)
+        if new_bet > self.balance:
+            return False
+        self.bet_amount = new_bet
+        return True
+
+
+def simulate_rounds(mine_count, reveals, rounds, bet=1.0, cells=ROWS * COLS, edge=HOUSE_EDGE, rng=None):
+    """Play many rounds at once, each revealing `reveals` cells (an int or one value per round) then cashing out.
+
+    The number of mines hit among the revealed cells follows a hypergeometric
+    law, so a round is won exactly when that draw is zero.
+    Returns the win rate, the mean net result per round and the return-to-player.
+    """
+    rng = rng or np.random.default_rng()
+    reveals = np.broadcast_to(np.asarray(reveals, dtype=np.int64), (rounds,))
+    hits = rng.hypergeometric(mine_count, cells - mine_count, reveals)
+    won = hits == 0
+    # Same table as reward(), unrounded
+    payout = bet * multipliers(mine_count, cells, edge)[reveals]
+    net = np.where(won, payout - bet, -bet)
+    return {
+        "rounds": rounds,
+        "win_rate": float(won.mean()),
+        "mean_net": float(net.mean()),
+        "rtp": float((bet + net.mean()) / bet),
+    }
+
+
+if __name__ == "__main__":
+    write_payout_table(sys.stdout)  # python mines_engine.py > payouts.csv
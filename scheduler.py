@@ -0,0 +1,84 @@
+import heapq
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedClock:
+    """Clock running `speed` times faster than real time."""
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.origin = time.monotonic()
+
+    def now(self):
+        return (time.monotonic() - self.origin) * self.speed
+
+    def real_delay(self, delay):
+        return delay / self.speed
+
+
+class LoanScheduler:
+    """Single thread firing loan repayments from a heap of due times."""
+
+    def __init__(self, callback, period=300, clock=None, retry_delay=30):
+        self.callback = callback  # Called with the ids due; returns the ids to schedule again
+        self.period = period
+        self.retry_delay = retry_delay  # Wait before firing again the repayments of a callback that raised
+        self.clock = clock or SimulatedClock()
+        self.heap = []  # (due time, user_id)
+        self.scheduled = set()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def __len__(self):
+        return len(self.scheduled)
+
+    def __contains__(self, user_id):
+        return user_id in self.scheduled
+
+    def schedule(self, user_id):
+        with self.condition:
+            if user_id in self.scheduled:
+                return
+            self.scheduled.add(user_id)
+            heapq.heappush(self.heap, (self.clock.now() + self.period, user_id))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def pop_due(self):
+        """Block until at least one repayment is due and pop every due entry."""
+        with self.condition:
+            while not self.heap or self.heap[0][0] > self.clock.now():
+                timeout = self.clock.real_delay(self.heap[0][0] - self.clock.now()) if self.heap else None
+                self.condition.wait(timeout)
+            now = self.clock.now()
+            due = []
+            while self.heap and self.heap[0][0] <= now:
+                due.append(heapq.heappop(self.heap))
+            return due
+
+    def run(self):
+        while True:
+            due = self.pop_due()
+            try:
+                keep = self.callback([user_id for _, user_id in due])
+            except Exception:
+                # The thread must survive, or no repayment would ever fire again
+                logger.exception("Loan repayment failed, retrying %d accounts", len(due))
+                with self.condition:
+                    retry = self.clock.now() + self.retry_delay
+                    for _, user_id in due:
+                        heapq.heappush(self.heap, (retry, user_id))
+                continue
+            with self.condition:
+                for due_time, user_id in due:
+                    if user_id in keep:
+                        heapq.heappush(self.heap, (due_time + self.period, user_id))
+                    else:
+                        self.scheduled.discard(user_id)
@@ -0,0 +1,113 @@
+"""JSON-lines TCP server giving many clients access to the bank at once.
+
+Usage: python server.py [--host HOST] [--port PORT] [--sqlite]
+
+Each request is one JSON object per line with an "op" field, and gets one
+reply line: {"ok": true, ...} or {"ok": false, "error": "..."}.
+
+    {"op": "login", "name": ..., "surname": ..., "password": ...}  -> {"session": ...}
+    {"op": "logout", "session": ...}
+    {"op": "balance", "session": ...}                             -> {"balance": ...}
+    {"op": "transfer", "session": ..., "to": user_id, "amount": ...}
+    {"op": "invest", "session": ..., "asset": ..., "amount": ...}  -> {"shares": ...}
+    {"op": "withdraw", "session": ..., "asset": ..., "amount": ...} -> {"shares": ...}
+    {"op": "loan", "session": ..., "amount": ..., "months": ...}   -> {"installment": ...}
+"""
+import argparse
+import asyncio
+import json
+import secrets
+
+from main import Bank, BankError
+from storage import SqliteStore
+
+
+class BankServer:
+    """Serves one Bank to every connection; logged-in users are kept in a session table."""
+
+    def __init__(self, bank):
+        self.bank = bank
+        self.sessions = {}  # Session token -> user_id
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                writer.write(json.dumps(self.dispatch(line), ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):  # Client gone, or a line over the reader limit
+            pass
+        finally:
+            writer.close()
+
+    def dispatch(self, line):
+        """Run one request line and return the reply."""
+        try:
+            request = json.loads(line)
+            handler = getattr(self, "op_" + str(request.get("op")), None)
+            if handler is None:
+                return {"ok": False, "error": "Opération inconnue."}
+            return {"ok": True, **(handler(request) or {})}
+        except BankError as error:
+            return {"ok": False, "error": str(error)}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {"ok": False, "error": "Requête invalide."}
+
+    def session_user(self, request):
+        user = self.bank.get_user(self.sessions.get(request.get("session")))
+        if user is None:
+            raise BankError("Session invalide.")
+        return user
+
+    def op_login(self, request):
+        user = self.bank.authenticate(request["name"], request["surname"], request["password"])
+        if user is None:
+            raise BankError("Identifiants incorrects!")
+        session = secrets.token_hex(16)
+        self.sessions[session] = user.user_id
+        return {"session": session, "user_id": user.user_id}
+
+    def op_logout(self, request):
+        self.sessions.pop(request.get("session"), None)
+
+    def op_balance(self, request):
+        return {"balance": self.session_user(request).balance}
+
+    def op_transfer(self, request):
+        sender = self.session_user(request)
+        receiver = self.bank.get_user(request["to"])
+        if receiver is None:
+            raise BankError("Destinataire invalide.")
+        self.bank.transfer(sender, receiver, float(request["amount"]))
+        return {"balance": sender.balance}
+
+    def op_invest(self, request):
+        return {"shares": self.bank.buy_asset(self.session_user(request), request["asset"], float(request["amount"]))}
+
+    def op_withdraw(self, request):
+        return {"shares": self.bank.sell_asset(self.session_user(request), request["asset"], float(request["amount"]))}
+
+    def op_loan(self, request):
+        user = self.session_user(request)
+        return {"installment": self.bank.grant_loan(user, float(request["amount"]), int(request["months"]))}
+
+
+async def serve(bank, host="127.0.0.1", port=8765, ready=None):
+    """Serve `bank` until cancelled; `ready` is called with the port once listening."""
+    server = await asyncio.start_server(BankServer(bank).handle, host, port)
+    if ready:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sqlite", action="store_true")
+    args = parser.parse_args()
+    bank = Bank(store=SqliteStore() if args.sqlite else None)
+    try:
+        asyncio.run(serve(bank, args.host, args.port, ready=lambda port: print(f"Listening on {args.host}:{port}")))
+    except KeyboardInterrupt:
+        pass
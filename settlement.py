@@ -0,0 +1,24 @@
+import numpy as np
+
+
+# Outcome of a repayment pass for one loan
+PAID_OFF = 0      # Nothing left to repay, the loan is closed
+REPAID = 1        # The installment was taken from the balance
+INSUFFICIENT = 2  # Balance too low, repayments stop
+
+
+def settle(balances, principal, installments):
+    """Run one monthly repayment pass over every loan at once.
+
+    Same rules as the per-user loop: a loan with nothing left is closed,
+    otherwise the installment is taken if the balance covers it.
+    Returns the new balances, the new remaining principal and the outcome of each loan.
+    """
+    paid_off = principal <= 0
+    repaid = ~paid_off & (balances >= installments)
+    status = np.full(len(balances), INSUFFICIENT, dtype=np.int8)
+    status[paid_off] = PAID_OFF
+    status[repaid] = REPAID
+    return (np.where(repaid, balances - installments, balances),
+            np.where(repaid, principal - installments, principal),
+            status)
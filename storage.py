@@ -0,0 +1,470 @@
+import abc
+import base64
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+
+
+# Fields of a User that change after the account is created
+MUTABLE_FIELDS = ("balance", "wallet", "loans", "trust")
+
+# Fewest bytes an update record, and each transaction in it, takes in the journal
+RECORD_BYTES = 90
+TRANSACTION_BYTES = 12
+
+# Shared by every journal record; json.dumps with options builds a new encoder per call
+ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def pack(typecode, values):
+    """Little-endian base64 of a column of numbers, for the columnar journal records."""
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return base64.b64encode(column.tobytes()).decode("ascii")
+
+
+def unpack(typecode, text):
+    column = array(typecode, base64.b64decode(text))
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def pack_history(strings, descriptions, amounts, times):
+    """Snapshot form of a user's transactions, from the columns of Ledger.columns."""
+    return {"strings": strings, "description": pack("I", descriptions), "amount": pack("d", amounts),
+            "time": pack("d", times)}
+
+
+def unpack_history(history):
+    strings = history["strings"]
+    return [{"description": strings[index], "amount": amount, "time": when}
+            for index, amount, when in zip(unpack("I", history["description"]), unpack("d", history["amount"]),
+                                           unpack("d", history["time"]))]
+
+
+class Store(abc.ABC):
+    """Persistence backend used by Bank.
+
+    Eager stores return every user from load(); lazy stores return nothing
+    there and hand users out one lookup at a time through the fetch methods.
+    Lazy stores also answer query(**filters), with the filters of
+    Ledger.query, since their transactions are not all in the ledger.
+    """
+
+    lazy = False
+
+    @abc.abstractmethod
+    def load(self):
+        """Return the user dicts to keep in memory."""
+
+    def fetch_by_id(self, user_id):
+        return None
+
+    def fetch_by_name(self, name, surname):
+        return []
+
+    @abc.abstractmethod
+    def create(self, user):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, user_id):
+        pass
+
+    @abc.abstractmethod
+    def update(self, users):
+        """Save the mutable fields of `users` and their transactions not saved yet."""
+
+    @abc.abstractmethod
+    def settle(self, users, balances, principal, charged, amounts, rows, description, when):
+        """Save a loan repayment pass of Bank.repay_loans; the caller holds self.lock."""
+
+    def should_compact(self):
+        return False
+
+    def will_compact(self, users):
+        return False
+
+    def snapshot(self, users):
+        pass
+
+
+class JournalStore(Store):
+    """Snapshot of every user plus an append-only journal of the changes made since."""
+
+    def __init__(self, snapshot_path="files/credentials.json", journal_path="files/journal.jsonl", min_journal_size=64 * 1024):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.min_journal_size = min_journal_size
+        self.snapshot_size = 0
+        self.journal_size = 0
+        self.logged = {}  # user_id -> number of transactions already written
+        self.generation = 0  # Bumped by every snapshot and stamped on the journal records written after it
+        self.journal = None
+        self.lock = threading.Lock()  # Keeps records whole and in the order of the changes
+
+    def load(self):
+        """Read the snapshot, replay the journal on top of it and return the user dicts."""
+        users = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as file:
+                snapshot = json.load(file)
+            if isinstance(snapshot, dict):
+                self.generation = snapshot["generation"]
+                snapshot = snapshot["users"]
+            for data in snapshot:  # Older snapshots are a bare list of users
+                history = data.pop("history", None)
+                if history is not None:  # Older snapshots hold the transactions as dicts
+                    data["transaction_history"] = unpack_history(history)
+                users[data["user_id"]] = data
+            self.snapshot_size = os.path.getsize(self.snapshot_path)
+
+        if os.path.exists(self.journal_path):
+            whole = 0  # End of the last whole record
+            with open(self.journal_path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break  # Torn write at the end of the journal
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    whole += len(line)
+                    # Records older than the snapshot are already in it: the
+                    # journal outlived a crash between the snapshot and its truncation.
+                    if record.get("gen", 0) >= self.generation:
+                        self.replay(users, record)
+            if whole < os.path.getsize(self.journal_path):
+                # Cut the torn tail, or the next record would be glued to it and lost with it
+                os.truncate(self.journal_path, whole)
+            self.journal_size = whole
+
+        self.logged = {user_id: len(data.get("transaction_history") or []) for user_id, data in users.items()}
+        return list(users.values())
+
+    @staticmethod
+    def replay(users, record):
+        op = record["op"]
+        if op == "create":
+            users[record["user"]["user_id"]] = record["user"]
+        elif op == "delete":
+            users.pop(record["id"], None)
+        elif op == "update" and record["id"] in users:
+            data = users[record["id"]]
+            data.update(record["set"])
+            history = data.setdefault("transaction_history", [])
+            for description, amount, *when in record["tx"]:  # Older records have no time
+                history.append({"description": description, "amount": amount, "time": when[0] if when else 0.0})
+        elif op == "settle":
+            ids = record["ids"]
+            for user_id, balance, remaining in zip(ids, unpack("d", record["balance"]), unpack("d", record["principal"])):
+                data = users.get(user_id)
+                if data is None:
+                    continue
+                data["balance"] = balance
+                if math.isnan(remaining):
+                    data["loans"].pop("Prêt", None)
+                else:
+                    data["loans"]["Prêt"] = remaining
+            for index, amount in zip(unpack("I", record["charged"]), unpack("d", record["amounts"])):
+                data = users.get(ids[index])
+                if data is not None:
+                    data.setdefault("transaction_history", []).append(
+                        {"description": record["description"], "amount": amount, "time": record["time"]})
+
+    def append(self, *records):
+        """Write records stamped with the current generation; the caller holds the lock."""
+        self.write(self.encode(records, self.generation))
+
+    @staticmethod
+    def encode(records, generation):
+        for record in records:
+            record["gen"] = generation
+        return "".join(ENCODER.encode(record) + "\n" for record in records)
+
+    def write(self, data):
+        if self.journal is None:
+            self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.journal.write(data)
+        self.journal.flush()
+        self.journal_size += len(data.encode("utf-8"))
+
+    def create(self, user):
+        with self.lock:
+            data = user.to_dict()
+            self.append({"op": "create", "user": data})
+            self.logged[user.user_id] = len(data["transaction_history"])
+
+    def delete(self, user_id):
+        with self.lock:
+            self.append({"op": "delete", "id": user_id})
+            self.logged.pop(user_id, None)
+
+    def update(self, users):
+        """Append one record per user holding its mutable fields and its new transactions.
+
+        The caller holds the locks of `users`, so no other update can change
+        what their records hold: they are built and encoded before taking the
+        store lock, which only covers the write.
+        """
+        # snapshot() resets logged before bumping the generation: reading them
+        # in the other order, an unchanged generation means logged was current.
+        generation, logged = self.generation, self.logged
+        records, counts = self.update_records(users, logged)
+        if not records:
+            return
+        data = self.encode(records, generation)
+        with self.lock:
+            if generation != self.generation:  # A snapshot came in between: start from what it wrote
+                records, counts = self.update_records(users, self.logged)
+                data = self.encode(records, self.generation)
+            self.write(data)
+            self.logged.update(counts)
+
+    @staticmethod
+    def update_records(users, logged):
+        """Update records of `users` holding the transactions after those in `logged`, and the new counts."""
+        records = []
+        counts = {}
+        for user in users:
+            start = logged.get(user.user_id, 0)
+            new = user.transactions_since(start)
+            records.append({
+                "op": "update",
+                "id": user.user_id,
+                "set": {field: getattr(user, field) for field in MUTABLE_FIELDS},
+                "tx": new,
+            })
+            counts[user.user_id] = start + len(new)
+        return records, counts
+
+    def settle(self, users, balances, principal, charged, amounts, rows, description, when):
+        """Journal a loan repayment pass as one columnar record; the caller holds the lock.
+
+        `principal` is NaN for the loans closed. `charged` indexes the users
+        who paid an installment, with its amount and the number of ledger
+        rows the user had before it in `amounts` and `rows`.
+        """
+        logged = self.logged
+        ids = [user.user_id for user in users]
+        charged_ids = list(map(ids.__getitem__, charged))
+        # A user whose rows logged before the repayment are still unsaved gets
+        # an update record instead, holding them all in order.
+        late = {index for index, (saved, row) in enumerate(zip(map(logged.get, charged_ids), rows))
+                if (saved or 0) != row}
+        behind = [users[charged[index]] for index in sorted(late)]
+        if late:
+            keep = [index not in late for index in range(len(charged))]
+            charged, amounts, rows, charged_ids = (
+                [value for value, kept in zip(column, keep) if kept] for column in (charged, amounts, rows, charged_ids))
+        logged.update(zip(charged_ids, map((1).__add__, rows)))
+        records, counts = self.update_records(behind, logged)
+        logged.update(counts)
+        self.append({
+            "op": "settle",
+            "ids": ids,
+            "balance": pack("d", balances),
+            "principal": pack("d", principal),
+            "charged": pack("I", charged),
+            "amounts": pack("d", amounts),
+            "description": description,
+            "time": when,
+        }, *records)
+
+    def should_compact(self, pending=0):
+        # Compacting once the journal outgrows the snapshot keeps the amortized
+        # cost of a write proportional to the record, not to the number of users.
+        return self.journal_size + pending > max(self.snapshot_size, self.min_journal_size)
+
+    def will_compact(self, users):
+        """Whether journaling the changes of `users` is sure to call for a snapshot right after."""
+        logged = self.logged
+        return self.should_compact(sum(
+            RECORD_BYTES + TRANSACTION_BYTES * (user.transaction_count - logged.get(user.user_id, 0)) for user in users))
+
+    def snapshot(self, users):
+        """Write every user to a new snapshot and start an empty journal."""
+        # Changes made to the users while they are read here are journaled
+        # after the snapshot, since update() waits for the lock.
+        with self.lock:
+            data = []
+            logged = {}
+            for user in users:
+                # Transactions go in as base64 columns, which cost far less to encode than one dict each
+                record = user.to_dict(history=False)
+                columns = user.history_columns()
+                record["history"] = pack_history(*columns)
+                logged[user.user_id] = len(columns[2])
+                data.append(record)
+            generation = self.generation + 1
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w") as file:
+                # One-shot dumps without indent uses the C encoder
+                file.write(json.dumps({"generation": generation, "users": data}))
+                file.flush()
+                os.fsync(file.fileno())  # On disk before it replaces the old snapshot
+            os.replace(tmp_path, self.snapshot_path)
+            # From here a crash leaves the old journal, whose records load() skips by generation
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = open(self.journal_path, "w", encoding="utf-8")
+            self.snapshot_size = os.path.getsize(self.snapshot_path)
+            self.journal_size = 0
+            self.logged = logged
+            self.generation = generation  # After logged, see update()
+
+
+class SqliteStore(Store):
+    """Users and transactions in an SQLite database, loaded on demand."""
+
+    lazy = True
+
+    USER_COLUMNS = ("user_id", "name", "surname", "password", "age", "permissions", "balance",
+                    "wallet", "trust", "loans", "can_delete", "code")
+
+    def __init__(self, path="files/bank.db"):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.logged = {}
+
+    def load(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    surname TEXT NOT NULL,
+                    password TEXT NOT NULL,
+                    age INTEGER NOT NULL,
+                    permissions INTEGER NOT NULL,
+                    balance REAL NOT NULL,
+                    wallet TEXT NOT NULL,
+                    trust INTEGER NOT NULL,
+                    loans TEXT NOT NULL,
+                    can_delete INTEGER NOT NULL,
+                    code INTEGER
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS users_name ON users (name, surname)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id INTEGER PRIMARY KEY,
+                    user_id TEXT NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+                    description TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    time REAL NOT NULL DEFAULT 0
+                )""")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(transactions)")}
+            if "time" not in columns:  # Database created before transactions were timestamped
+                self.conn.execute("ALTER TABLE transactions ADD COLUMN time REAL NOT NULL DEFAULT 0")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS transactions_user ON transactions (user_id, id)")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        return []
+
+    def query(self, user_id=None, start=None, end=None, min_amount=None, max_amount=None, description=None,
+              after=None, newest_first=False):
+        """Yield the matching transactions of the database one at a time, with their row id as "cursor".
+
+        Same filters as Ledger.query, but over every user, loaded or not. Rows
+        are read from their own connection, so a long export sees one
+        consistent state and does not hold up the writers.
+        """
+        conditions = []
+        values = []
+        for condition, value in (("user_id = ?", user_id), ("time >= ?", start), ("time <= ?", end),
+                                 ("amount >= ?", min_amount), ("amount <= ?", max_amount),
+                                 ("id < ?" if newest_first else "id > ?", after)):
+            if value is not None:
+                conditions.append(condition)
+                values.append(value)
+        if description is not None:
+            conditions.append("instr(lower_text(description), ?) > 0")
+            values.append(description.lower())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = sqlite3.connect(self.path)
+        conn.create_function("lower_text", 1, str.lower, deterministic=True)  # SQLite lower() only folds ASCII
+        try:
+            for cursor, owner, text, amount, when in conn.execute(
+                    f"SELECT id, user_id, description, amount, time FROM transactions {where} "
+                    f"ORDER BY id {'DESC' if newest_first else 'ASC'}", values):
+                yield {"description": text, "amount": amount, "time": when, "user_id": owner, "cursor": cursor}
+        finally:
+            conn.close()
+
+    def row_to_dict(self, row):
+        data = dict(zip(self.USER_COLUMNS, row))
+        data["wallet"] = json.loads(data["wallet"])
+        data["loans"] = json.loads(data["loans"])
+        data["can_delete"] = bool(data["can_delete"])
+        data["transaction_history"] = [
+            {"description": description, "amount": amount, "time": when}
+            for description, amount, when in self.conn.execute(
+                "SELECT description, amount, time FROM transactions WHERE user_id = ? ORDER BY id", (data["user_id"],))
+        ]
+        self.logged[data["user_id"]] = len(data["transaction_history"])
+        return data
+
+    def fetch_by_id(self, user_id):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.USER_COLUMNS)} FROM users WHERE user_id = ?", (user_id,)).fetchone()
+            return self.row_to_dict(row) if row else None
+
+    def fetch_by_name(self, name, surname):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(self.USER_COLUMNS)} FROM users WHERE name = ? AND surname = ?", (name, surname)).fetchall()
+            return [self.row_to_dict(row) for row in rows]
+
+    def create(self, user):
+        values = [getattr(user, column) for column in self.USER_COLUMNS]
+        values[self.USER_COLUMNS.index("wallet")] = json.dumps(user.wallet)
+        values[self.USER_COLUMNS.index("loans")] = json.dumps(user.loans)
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"INSERT INTO users ({', '.join(self.USER_COLUMNS)}) VALUES ({', '.join('?' * len(self.USER_COLUMNS))})",
+                values)
+            self.insert_transactions(user.user_id, user.transactions_since(0))
+        self.logged[user.user_id] = user.transaction_count
+
+    def delete(self, user_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+        self.logged.pop(user_id, None)
+
+    def update(self, users):
+        """Write the given users and their new transactions in a single SQL transaction."""
+        if not users:
+            return
+        with self.lock, self.conn:
+            self.write(users)
+
+    def settle(self, users, balances, principal, charged, amounts, rows, description, when):
+        """Write the users changed by a loan repayment pass; the caller holds the lock."""
+        with self.conn:
+            self.write(users)
+
+    def write(self, users):
+        for user in users:
+            start = self.logged.get(user.user_id, 0)
+            new = user.transactions_since(start)
+            self.conn.execute(
+                "UPDATE users SET balance = ?, wallet = ?, loans = ?, trust = ? WHERE user_id = ?",
+                (user.balance, json.dumps(user.wallet), json.dumps(user.loans), user.trust, user.user_id))
+            self.insert_transactions(user.user_id, new)
+            self.logged[user.user_id] = start + len(new)
+
+    def insert_transactions(self, user_id, transactions):
+        self.conn.executemany(
+            "INSERT INTO transactions (user_id, description, amount, time) VALUES (?, ?, ?, ?)",
+            [(user_id, *transaction) for transaction in transactions])
@@ -0,0 +1,119 @@
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+from main import Bank, User
+from storage import JournalStore
+
+
+class JournalStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.snapshot_path = os.path.join(self.tmp.name, "credentials.json")
+        self.journal_path = os.path.join(self.tmp.name, "journal.jsonl")
+
+    def open_bank(self, **options):
+        return Bank(store=JournalStore(self.snapshot_path, self.journal_path, **options))
+
+    def add_users(self, bank, count=2, balance=50.0):
+        for index in range(count):
+            user = User(f"name{index}", f"surname{index}", "", 30, f"id{index}", balance=balance, ledger=bank.ledger)
+            bank.index_user(user)
+            bank.store.create(user)
+        return [bank.users[f"id{index}"] for index in range(count)]
+
+    def assertSameUsers(self, bank, reloaded):
+        self.assertEqual(set(bank.users), set(reloaded.users))
+        for user_id, user in bank.users.items():
+            other = reloaded.users[user_id]
+            self.assertEqual((other.balance, other.loans, other.transaction_history),
+                             (user.balance, user.loans, user.transaction_history))
+
+    def test_replay(self):
+        bank = self.open_bank()
+        sender, receiver = self.add_users(bank)
+        for amount in (1.0, 2.5, 4.0):
+            bank.transfer(sender, receiver, amount)
+        self.assertFalse(os.path.exists(self.snapshot_path))
+        reloaded = self.open_bank()
+        self.assertSameUsers(bank, reloaded)
+        self.assertEqual(reloaded.users["id0"].balance, 42.5)
+
+    def test_compaction(self):
+        bank = self.open_bank(min_journal_size=256)
+        sender, receiver = self.add_users(bank)
+        for _ in range(20):
+            bank.transfer(sender, receiver, 1.0)
+        self.assertGreater(bank.store.generation, 0)
+        self.assertSameUsers(bank, self.open_bank(min_journal_size=256))
+
+    def test_crash_between_snapshot_and_journal_truncation(self):
+        bank = self.open_bank()
+        sender, receiver = self.add_users(bank)
+        bank.transfer(sender, receiver, 5.0)
+        with open(self.journal_path, "rb") as file:
+            journal = file.read()
+        bank.store.snapshot(list(bank.users.values()))
+        with open(self.journal_path, "wb") as file:  # The truncation never happened
+            file.write(journal)
+        reloaded = self.open_bank()
+        self.assertSameUsers(bank, reloaded)
+        self.assertEqual(len(reloaded.users["id0"].transaction_history), 1)
+
+    def test_concurrent_transfers(self):
+        bank = self.open_bank(min_journal_size=4096)  # Snapshots come in while records are being built
+        users = self.add_users(bank, count=8, balance=1000.0)
+
+        def transfers(seed):
+            rng = random.Random(seed)
+            for _ in range(300):
+                sender, receiver = rng.sample(users, 2)
+                bank.transfer(sender, receiver, 1.0)
+
+        threads = [threading.Thread(target=transfers, args=(seed,)) for seed in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreater(bank.store.generation, 1)
+        self.assertSameUsers(bank, self.open_bank())
+
+    def test_loan_repayment_pass(self):
+        bank = self.open_bank()
+        users = self.add_users(bank, count=4, balance=250.0)
+        for user in users:
+            user.loans = {"Prêt": 200.0, "mensualite": 100.0}
+        users[1].balance = 20.0  # Cannot pay
+        bank.save_users(*users)
+        users[2].log_transaction("Dépôt", 5.0)  # Logged but not saved yet: journaled with the repayment
+        users[2].balance += 5.0
+        for _ in range(3):
+            bank.repay_loans([user.user_id for user in users])
+
+        reloaded = self.open_bank()
+        self.assertSameUsers(bank, reloaded)
+        self.assertEqual((reloaded.users["id0"].balance, reloaded.users["id1"].balance), (50.0, 20.0))
+        self.assertNotIn("Prêt", reloaded.users["id0"].loans)
+        self.assertEqual([row["amount"] for row in reloaded.users["id2"].transaction_history], [5.0, -100.0, -100.0])
+
+    def test_torn_tail(self):
+        bank = self.open_bank()
+        sender, receiver = self.add_users(bank)
+        bank.transfer(sender, receiver, 15.0)
+        with open(self.journal_path, "ab") as file:
+            file.write(b'{"op":"update","id":"id0","set":{"bal')
+
+        reloaded = self.open_bank()
+        self.assertEqual(reloaded.users["id0"].balance, 35.0)
+        reloaded.transfer(reloaded.users["id0"], reloaded.users["id1"], 1.0)
+
+        again = self.open_bank()
+        self.assertEqual((again.users["id0"].balance, again.users["id1"].balance), (34.0, 66.0))
+        self.assertSameUsers(reloaded, again)
+
+
+if __name__ == "__main__":
+    unittest.main()
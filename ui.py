@@ -0,0 +1,38 @@
+import functools
+
+import pygame
+
+
+# (font, text, color) -> surface of the fixed labels of the widgets; never evicted
+labels = {}
+
+
+def render_label(font, text, color):
+    """Rendered surface of a fixed label (button, menu option), kept for the whole session."""
+    key = (font, text, color)
+    surface = labels.get(key)
+    if surface is None:
+        surface = labels[key] = font.render(text, True, color)
+    return surface
+
+
+@functools.lru_cache(maxsize=256)
+def render_text(font, text, color):
+    """Rendered surface of a value that changes (balance, percentage), shared while it stays in the cache."""
+    return font.render(text, True, color)
+
+
+def next_events(clock, active, max_fps=30, idle_timeout=1000):
+    """Events for the next frame.
+
+    While something moves on screen the loop runs at up to `max_fps`; otherwise
+    it sleeps in pygame.event.wait until an event arrives or `idle_timeout` ms pass.
+    """
+    if active:
+        clock.tick(max_fps)
+        return pygame.event.get()
+    event = pygame.event.wait(idle_timeout)
+    events = [] if event.type == pygame.NOEVENT else [event]
+    events.extend(pygame.event.get())
+    clock.tick()  # Restart the frame timer after sleeping
+    return events